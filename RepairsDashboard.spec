@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('images', 'images'), ('AutoSequenceRepo', 'AutoSequenceRepo'), ('search_regions.json', '.'), ('user_assets.json', '.'), ('requirements.txt', '.')],
+    datas=[('images', 'images'), ('AutoSequenceRepo', 'AutoSequenceRepo'), ('search_regions.json', '.'), ('user_assets.json', '.'), ('model_prefixes.json', '.'), ('requirements.txt', '.')],
     hiddenimports=['PIL._tkinter_finder', 'skimage.metrics.structural_similarity', 'utils.automation_helpers', 'utils.debug_ui_widgets', 'core.db', 'ui_tabs.calendar_tab', 'ui_tabs.importer_tab', 'ui_tabs.job_card_manager_tab', 'ui_tabs.job_indexer_tab', 'ui_tabs.tag_manager_tab', 'ui_tabs.batch_tasker_tab', 'ui_tabs.job_card_instance', 'ui_tabs.overview_tab', 'ui_tabs.milwaukee_warranties_tab', 'services.aden_controller', 'services.aden_automation'],
     hookspath=[],
     hooksconfig={},
@@ -6,7 +6,6 @@ import os
 import json
 import logging
 import threading
-import time
 import re
 from datetime import datetime
 import sqlite3
@@ -16,27 +15,29 @@ import ttkbootstrap as ttk
 from tkinter import messagebox, simpledialog
 from tkinter.scrolledtext import ScrolledText
 
-import pytesseract
-import pyautogui
-
 # Local imports
 from core import db
 from core.db import DB_NAME
 from ui_tabs.calendar_tab import CalendarTab
 from services.aden_controller import add_job_line, save_and_close_job
+from services.job_class import JOB_CLASS_MAP
 from utils.automation_helpers import (
-    find_and_click,
-    find_and_right_click,
-    find_label_and_click_offset,
-    find_and_double_click_offset,
-    find_and_move_to,
-    wait_for_image,
-    paste_from_clipboard,
-    get_region,
-    find_image_in_region
+    start_frame_service,
+    stop_frame_service,
+    TEMPLATES,
+    MATCH_CACHE,
+    LOCATION_PRIORS,
+    FAILURE_SNAPSHOTS
 )
 
+from utils.app_paths import data_path
 from utils.debug_ui_widgets import TextHandler
+from utils.debug_capture_store import DebugCaptureStore
+from utils.ocr_engine import get_ocr_engine
+from utils.ocr_cache import OcrCache
+from utils.keyword_matcher import get_keyword_matcher
+from utils.sequence_compiler import SequenceCache
+from utils.sequence_engine import SequenceEngine
 # --- Import stubs for our new Tab modules ---
 # We will create these files in the next steps.
 from ui_tabs.overview_tab import OverviewTab
@@ -58,18 +59,11 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 # Constants
 SEQ_REPO = resource_path("AutoSequenceRepo")
-DEBUG_IMG_REPO = resource_path("debug_images")
-JOB_CLASS_MAP = {
-    'C': 'Cash Sale',
-    'E': 'Workshop Job',
-    'J': 'Jobs Completed',
-    'Q': 'Quote',
-    'F': 'Warranty Jobs'
-}
-TOOL_SUBJECT_KEYWORDS = [
-    "Makita", "DeWalt", "Milwaukee", "Bosch", "Hikoki", "Bayer", "Gensafe", "Hush100",
-    "Hush150", "Hush70", "Hush50", "EGO", "Paslode", "Battery"
-]    
+FRAME_CAPTURE_FPS = 10  # Rate of the shared ADEN window capture while sequences run
+DEBUG_CAPTURE_DB = data_path("debug_captures.db")
+DEBUG_CAPTURE_MODE = "failure"  # "off", "sampled", "failure" or "all" (see utils/debug_capture_store.py)
+DEBUG_CAPTURE_RETENTION_DAYS = 7
+OCR_CACHE_DB = data_path("ocr_cache.db")
 
 class JobScannerApp:
     def __init__(self):
@@ -86,6 +80,21 @@ class JobScannerApp:
         # Setup logging first before any logging calls
         self.setup_logging()
 
+        # Decode every reference image once so the first automation step doesn't pay for it
+        loaded = TEMPLATES.preload()
+        self.logger.info(f"Preloaded {loaded} reference templates.")
+
+        # OCR captures are kept for debugging in the background, according to DEBUG_CAPTURE_MODE
+        self.debug_captures = DebugCaptureStore(DEBUG_CAPTURE_DB, mode=DEBUG_CAPTURE_MODE)
+        # Re-scrapes of unchanged cards reuse earlier OCR results instead of calling Tesseract again
+        self.ocr_cache = OcrCache(db_path=OCR_CACHE_DB)
+        # Tool subject keywords and model prefixes are compiled once
+        matcher = get_keyword_matcher()
+        self.logger.info(f"Tool subject matcher ready with {len(matcher.subjects)} terms.")
+        # The step engine is shared with the debug utility; sequences are compiled against its actions
+        self.engine = SequenceEngine(ocr_cache=self.ocr_cache, debug_captures=self.debug_captures)
+        self.sequences = SequenceCache(self.engine.actions)
+
         # --- Shared Tkinter Variables ---
         # These are kept in the controller so different tabs can access them if needed.
         self.sequence_var = tk.StringVar(master=self.root)
@@ -226,9 +235,11 @@ class JobScannerApp:
             return completion_event, success_event
 
         try:
-            with open(sequence_path, 'r', encoding='utf-8') as f:
-                sequence_data = json.load(f)
-            steps = sequence_data.get("steps", [])
+            # Compiled once per file version; unknown actions, missing assets and bad parameters fail here
+            steps = self.sequences.load(sequence_path).steps
+
+            # Share one background capture of the ADEN window between all waiters
+            start_frame_service(fps=FRAME_CAPTURE_FPS)
 
             automation_thread = threading.Thread(
                 target=self._execute_sequence_thread,
@@ -252,34 +263,17 @@ class JobScannerApp:
         job_ref = data_context.get("job_ref", "UNKNOWN")
         self.logger.info(f"Automation thread started for {job_ref}. Executing {len(steps)} steps.")
 
-        sequence_success = True
-        for i, step in enumerate(steps):
-            if skip_event and skip_event.is_set():
-                self.logger.warning(f"Skip signal received. Halting sequence for job {job_ref}.")
-                sequence_success = False
-                break
-
-            action = step.get("action", "")
-            target = step.get("target_image")
-            params = step.get("parameters", {})
-            self.logger.info(f"Executing step {i + 1}: {action} on target {target}")
-
-            success = self._execute_single_step(action, target, params, data_context)
-
-            if not success:
-                self.logger.error(f"Stopping sequence for {job_ref} due to failure at step {i + 1} ({action}).")
-                sequence_success = False
-                break
-
-            time.sleep(0.5)
-
+        # Waits for any OCR still in flight before returning
+        sequence_success = self.engine.run(steps, data_context, stop_event=skip_event,
+                                           label=f"sequence for job {job_ref}", job_ref=job_ref)
         if sequence_success:
             self.logger.info("--- Data Scraped Report ---")
             for key, value in data_context.items():
                 self.logger.info(f"  > {key}: {value!r}")
             self.logger.info("---------------------------")
 
-            if self._is_data_valid(data_context):
+            sequence_success = self._is_data_valid(data_context)
+            if sequence_success:
                 db.insert_job(data_context)
                 self.logger.info(f"✅ Saved job: {job_ref}")
                 try:
@@ -292,151 +286,24 @@ class JobScannerApp:
                 if hasattr(self, 'importer_tab'):
                     self.root.after(0, self.importer_tab.flagged_list.insert, tk.END, job_ref)
 
+        self.debug_captures.finish_job(job_ref, sequence_success)
         self.root.after(0, self.refresh_all_views)
+        cache_stats = MATCH_CACHE.stats()
+        self.logger.debug(f"Match cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                          f"({cache_stats['hit_rate']:.0%}), {cache_stats['size']} entries.")
+        ocr_cache_stats = self.ocr_cache.stats()
+        self.logger.debug(f"OCR cache: {ocr_cache_stats['hits']} hits / {ocr_cache_stats['misses']} misses "
+                          f"({ocr_cache_stats['hit_rate']:.0%}).")
+        for backend, ocr_stats in get_ocr_engine().stats().items():
+            self.logger.debug(f"OCR ({backend}): {ocr_stats['calls']} calls, avg {ocr_stats['avg_ms']:.0f}ms, "
+                              f"p95 {ocr_stats['p95_ms']:.0f}ms, max {ocr_stats['max_ms']:.0f}ms.")
+        for action, step_stats in self.engine.stats().items():
+            self.logger.debug(f"Step '{action}': {step_stats['calls']} runs, avg {step_stats['avg_ms']:.0f}ms, "
+                              f"max {step_stats['max_ms']:.0f}ms.")
+        LOCATION_PRIORS.save()
         self.logger.info(f"Automation thread for {job_ref} finished.")
         completion_event.set()
 
-    def _execute_single_step(self, action, target, params, data_context):
-        """
-        Executes a single automation step. This is the core logic engine.
-        Returns True on success, False on failure.
-        """
-        try:
-            # --- Data-Driven Actions ---
-            if action == "type_from_context":
-                key = params.get("param1")
-                if key in data_context:
-                    pyautogui.write(str(data_context[key]), interval=0.05)
-                    return True
-                self.logger.error(f"Key '{key}' not found in data context.")
-                return False
-
-            elif action == "count_list_items":
-                input_key, output_key = params.get("param1"), params.get("param2")
-                input_list = data_context.get(input_key, [])
-                if isinstance(input_list, list):
-                    data_context[output_key] = len(input_list)
-                    self.logger.info(f"Counted {len(input_list)} items in '{input_key}', stored in '{output_key}'.")
-                    return True
-                self.logger.error(f"Key '{input_key}' in context is not a list.")
-                return False
-
-            elif action == "press_key_context":
-                key, count_key = params.get("param1"), params.get("param2")
-                count = data_context.get(count_key, 0)
-                if isinstance(count, int):
-                    pyautogui.press(key, presses=count)
-                    return True
-                self.logger.error(f"Count variable '{count_key}' is not an integer.")
-                return False
-
-            # --- OCR and UI Interaction Actions ---
-            elif action == "ocr_capture":
-                absolute_region = get_region(target)
-                self.logger.info(f"Performing OCR capture on region '{target}' at {absolute_region}")
-                img = pyautogui.screenshot(region=absolute_region)
-
-                # Ensure the debug images directory exists
-                os.makedirs(DEBUG_IMG_REPO, exist_ok=True)
-                debug_filename = os.path.join(DEBUG_IMG_REPO, f"ocr_debug_capture_{target}_{int(time.time())}.png")
-                img.save(debug_filename)
-
-                data_key = params.get("param1", "").strip()
-                config = ''
-                if data_key == 'Job_Class_Cond': 
-                    config = r'--oem 3 --psm 10'
-                elif data_key == 'job_ref': 
-                    config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
-                elif data_key == 'customer_no':
-                    config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
-                elif data_key == 'customer_name':
-                    config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz '
-                elif data_key == 'date': 
-                    config = r'--oem 3 --psm 7'
-                text = pytesseract.image_to_string(img, config=config)
-                if data_key == 'job_ref':
-                    data_context[data_key] = re.sub(r'[^A-Za-z0-9]', '', text).strip()
-                elif data_key == 'descriptions':
-                    lines = text.splitlines()
-                    if 'descriptions' not in data_context: data_context['descriptions'] = []
-                    data_context['descriptions'].extend(lines)
-                    found_subject = False
-                    for line in lines:
-                        for keyword in TOOL_SUBJECT_KEYWORDS:
-                            if keyword.lower() in line.lower():
-                                data_context['tool_subject'] = keyword
-                                self.logger.info(f"Found Tool Subject keyword: '{keyword}'")
-                                found_subject = True
-                                break # Stop after finding the first keyword
-                        if found_subject:
-                            break
-                elif data_key == 'Job_Class_Cond':
-                    data_context[data_key] = JOB_CLASS_MAP.get(text.strip().upper(), text.strip())
-                elif data_key:
-                    data_context[data_key] = text.strip()
-                if data_key:
-                    self.logger.info(f"Assigned captured text to data context key: '{data_key}'")
-                else:
-                    self.logger.warning(f"OCR step for target '{target}' is missing 'Parameter 1'.")
-                return True
-
-            elif action == "click_center": return find_and_click(target)
-            elif action == "right_click_center": return find_and_right_click(target)
-            elif action == "double_click_center": return find_and_click(target, clicks=2)
-            elif action == "click_offset":
-                x, y = int(params.get("param1", 0)), int(params.get("param2", 0))
-                return find_label_and_click_offset(target, x_offset=x, y_offset=y)
-            elif action == "double_click_offset":
-                x, y = int(params.get("param1", 0)), int(params.get("param2", 0))
-                return find_and_double_click_offset(target, x_offset=x, y_offset=y)
-            elif action == "move_to_target": return find_and_move_to(target)
-            elif action == "type_text":
-                pyautogui.write(params.get("param1", ""), interval=0.05)
-                return True
-            elif action == "type_current_date":
-                # Parameter 1 can optionally specify a format (e.g., %d-%m-%Y)
-                date_format = params.get("param1", "%d/%m/%Y")
-                date_string = datetime.now().strftime(date_format)
-                self.logger.info(f"Typing current date: {date_string}")
-                pyautogui.write(date_string, interval=0.05)
-                return True
-            elif action == "press_key":
-                pyautogui.press(params.get("param1", "enter"))
-                return True
-            elif action == "sleep":
-                time.sleep(float(params.get("param1", 1.0)))
-                return True
-
-            elif action == "wait_for_target":
-                timeout = int(params.get("param1", 10))
-                return wait_for_image(target, timeout)
-
-            elif action == "find_image_in_region":
-                secondary_action = params.get("param1", "click")
-
-                if not target:
-                    self.logger.error("Action 'find_image_in_region' requires a target to be selected from the 'Select Target' combobox.")
-                    return False
-
-                self.logger.info(f"Finding image '{target}' in ADEN window region and performing '{secondary_action}'")
-                result = find_image_in_region(target, target, secondary_action)
-
-                # If the secondary action is "get_text" and text was found, store it in the context
-                if secondary_action == "get_text" and result and isinstance(result, str):
-                    output_key = f"{target}_text"
-                    data_context[output_key] = result
-                    self.logger.info(f"Stored extracted text in context variable '{output_key}'")
-
-                return result if isinstance(result, bool) else bool(result)
-
-            else:
-                self.logger.warning(f"Action '{action}' is not implemented.")
-                return False
-
-        except Exception as e:
-            self.logger.error(f"Error during step '{action}': {e}", exc_info=True)
-            return False
-
     def _is_data_valid(self, data):
         """Validates the scraped data dictionary before database insertion."""
         errors = []
@@ -492,13 +359,19 @@ class JobScannerApp:
         return files
 
     def clear_debug_images(self):
-        self.logger.info(f"Clearing old debug images from: {DEBUG_IMG_REPO}")
+        """
+        Clears the failure screenshots and prunes stored OCR debug captures older than
+        DEBUG_CAPTURE_RETENTION_DAYS.
+        """
+        self.logger.info(f"Clearing old debug images from: {FAILURE_SNAPSHOTS.directory}")
         try:
-            # Ensure the directory exists
-            os.makedirs(DEBUG_IMG_REPO, exist_ok=True)
-            for filename in os.listdir(DEBUG_IMG_REPO):
-                if filename.lower().endswith(".png"): os.remove(os.path.join(DEBUG_IMG_REPO, filename))
+            removed = FAILURE_SNAPSHOTS.clear()
+            self.logger.info(f"Removed {removed} failure screenshots.")
         except Exception as e: self.logger.error(f"Failed to clear debug images: {e}")
+        try:
+            removed = self.debug_captures.prune(DEBUG_CAPTURE_RETENTION_DAYS)
+            self.logger.info(f"Pruned {removed} debug captures older than {DEBUG_CAPTURE_RETENTION_DAYS} days.")
+        except Exception as e: self.logger.error(f"Failed to prune debug captures: {e}")
 
     def refresh_overview_tab(self):
         # A controller method to tell the overview tab to refresh itself
@@ -527,6 +400,11 @@ class JobScannerApp:
         except Exception as e:
             self.logger.error(f"Failed to save session: {e}")
 
+        stop_frame_service()
+        LOCATION_PRIORS.save()
+        FAILURE_SNAPSHOTS.flush(timeout=2)
+        self.debug_captures.flush(timeout=2)
+
         # --- Stop any running processes ---
         if hasattr(self, 'importer_tab') and self.importer_tab.importing:
             self.importer_tab.stop_import()
@@ -6,20 +6,24 @@ import re
 import threading
 import logging
 import tkinter as tk
-import datetime
 from tkinter import ttk, messagebox, simpledialog
 from tkinter.filedialog import askopenfilename
 from tkinter.scrolledtext import ScrolledText
 import pyautogui
 from PIL import Image, ImageTk, ImageOps
 import numpy as np
-import pytesseract
 from skimage.metrics import structural_similarity as ssim
 
-from utils.automation_helpers import (
-    find_and_click, find_label_and_click_offset, find_and_right_click, find_and_double_click_offset, find_and_move_to, wait_for_image,
-    find_aden_window, paste_from_clipboard, get_region, find_image_in_region
-)
+from utils.automation_helpers import find_aden_window, CONFIDENCE_LEVEL, MATCH_LOG_PATH
+from utils import screen_capture
+from utils.match_executor import get_match_executor
+from utils.ocr_engine import get_ocr_engine
+from utils.region_optimizer import propose_regions, format_report, write_regions
+from utils.region_stats import read_match_boxes
+from utils.sequence_compiler import compile_sequence, parse_post, SequenceError
+from utils.sequence_engine import SequenceEngine
+from utils.template_store import TemplateStore
+from utils.vision import to_gray
 # Import the custom widgets from the new module
 from utils.debug_ui_widgets import TextHandler, ScreenOverlay, CustomSpinbox
 
@@ -53,6 +57,7 @@ try:
     with open(USER_ASSETS_PATH, "r", encoding="utf-8") as f: _USER_ASSETS = json.load(f)
 except FileNotFoundError: _USER_ASSETS = {}
 IMAGE_ASSETS = {**_SYSTEM_ASSETS, **_USER_ASSETS}
+TEMPLATES = TemplateStore(IMAGE_ASSETS)
 
 def write_region(key, left, top, width, height):
     """Saves a region's coordinates to the JSON configuration file."""
@@ -81,6 +86,10 @@ class AutomationDesignerUI:
         self.automation_steps = []
         self.is_test_running = False
         self.stop_test_event = threading.Event()
+        self.engine = SequenceEngine()
+        self.engine.before_step_hooks.append(self._on_step_start)
+        self.engine.after_step_hooks.append(self._on_step_end)
+        self._test_item_ids = ()
 
         # Tkinter variables
         self.active_target_var = tk.StringVar(value=None)
@@ -93,6 +102,7 @@ class AutomationDesignerUI:
         self.action_var = tk.StringVar()
         self.param1_var = tk.StringVar()
         self.param2_var = tk.StringVar()
+        self.post_var = tk.StringVar()
         self.show_console_var = tk.BooleanVar(value=False)
 
         # Bindings
@@ -114,6 +124,8 @@ class AutomationDesignerUI:
         self.window_status_label = ttk.Label(status_frame, text="ADEN Window: NOT FOUND", background="lightcoral", foreground="black", padding=5, anchor="center", font=("Segoe UI", 9, "bold"))
         self.window_status_label.pack(side="left", fill="x", expand=True)
         ttk.Button(status_frame, text="Find ADEN Window", command=self.test_find_aden_window).pack(side="left", padx=10)
+        ttk.Button(status_frame, text="Check All Targets", command=self.check_all_targets).pack(side="left")
+        ttk.Button(status_frame, text="Optimize Regions", command=self.optimize_regions).pack(side="left", padx=(10, 0))
 
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill="both", expand=True, padx=10, pady=(0,5))
@@ -161,7 +173,8 @@ class AutomationDesignerUI:
         action_menu = ttk.Combobox(action_frame, textvariable=self.action_var, state="readonly", values=[
             "click_center", "right_click_center", "double_click_center", "click_offset", "double_click_offset", 
             "move_to_target", "type_text", "type_from_context", "type_current_date", "press_key", "hotkey", "paste_from_clipboard", "sleep",
-            "wait_for_target", "scroll_mouse", "ocr_capture", "count_list_items", "press_key_context", "find_image_in_region"
+            "wait_for_target", "scroll_mouse", "ocr_capture", "count_list_items", "press_key_context", "find_image_in_region", "wait_for_state",
+            "classify_job_class"
         ])
         action_menu.grid(row=0, column=1, padx=5, pady=5)
         action_menu.set("click_center")
@@ -170,6 +183,10 @@ class AutomationDesignerUI:
         ttk.Entry(action_frame, textvariable=self.param1_var).grid(row=1, column=1, padx=5, pady=5)
         ttk.Label(action_frame, text="Parameter 2:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
         ttk.Entry(action_frame, textvariable=self.param2_var).grid(row=2, column=1, padx=5, pady=5)
+        # Post-condition: blank uses the action's default; "visible:KEY" or a number of seconds can be typed
+        ttk.Label(action_frame, text="Wait After:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        ttk.Combobox(action_frame, textvariable=self.post_var, values=["", "none", "settle", "visible:", "0.5"]).grid(
+            row=3, column=1, padx=5, pady=5)
 
         step_mod_frame = ttk.Frame(config_panel)
         step_mod_frame.pack(pady=10, padx=5)
@@ -245,6 +262,55 @@ class AutomationDesignerUI:
             self.logger.error("Failed to find ADEN window.")
             self.window_status_label.config(text="ADEN Window: NOT FOUND", background="lightcoral")
 
+    def check_all_targets(self):
+        """Matches every target against one capture of the ADEN window in parallel and logs the scores."""
+        if not self.aden_window_region:
+            messagebox.showerror("Error", "Cannot check targets. Find the ADEN window first.")
+            return
+
+        window_gray = to_gray(screen_capture.grab(self.aden_window_region))
+        jobs = []
+        for key in sorted(IMAGE_ASSETS):
+            region = SEARCH_REGIONS.get(key)
+            haystack = window_gray
+            if region:
+                haystack = window_gray[region["top"]:region["top"] + region["height"],
+                                       region["left"]:region["left"] + region["width"]]
+            try:
+                jobs.append((key, haystack, TEMPLATES.get(key)))
+            except Exception as e:
+                self.logger.warning(f"Skipping '{key}': {e}")
+
+        self.show_console_var.set(True)
+        self.toggle_console()
+        self.logger.info(f"Checking {len(jobs)} targets against one capture of the ADEN window...")
+        found = 0
+        for key, score, loc in get_match_executor().match_many(jobs):
+            is_found = score >= CONFIDENCE_LEVEL
+            found += is_found
+            self.logger.info(f"  {'FOUND  ' if is_found else 'missing'} {key}: {score:.2%} at {loc}")
+        self.logger.info(f"{found} of {len(jobs)} targets visible.")
+
+    def optimize_regions(self):
+        """Proposes tighter search regions from the app's match log and optionally writes them."""
+        proposals = propose_regions(read_match_boxes(MATCH_LOG_PATH), SEARCH_REGIONS)
+        self.show_console_var.set(True)
+        self.toggle_console()
+        self.logger.info("Region optimization report:\n" + format_report(proposals))
+        if not proposals:
+            messagebox.showinfo("Optimize Regions", "No regions can be tightened with the matches logged so far.")
+            return
+        if not messagebox.askyesno("Optimize Regions", f"Tighten {len(proposals)} regions? (see console for details)\n"
+                                                       f"A backup of search_regions.json will be kept."):
+            return
+        try:
+            backup_path = write_regions(CONFIG_PATH, SEARCH_REGIONS, proposals)
+            self.logger.info(f"Search regions updated; backup saved to {backup_path}")
+            self.update_debugger_for_target(self.active_target_var.get())
+            messagebox.showinfo("Success", "Search regions updated. Restart the main app to use them.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to write search regions:\n{e}")
+
     def on_target_change(self, *args):
         target_name = self.active_target_var.get()
         self.logger.debug(f"Target changed to: {target_name}")
@@ -395,12 +461,12 @@ class AutomationDesignerUI:
                 self.root.update_idletasks()
                 time.sleep(0.1)
 
-            img = pyautogui.screenshot(region=absolute_region)
+            img = Image.fromarray(screen_capture.grab(absolute_region))
 
             # Updated: Use specific config for single characters
             # This dramatically improves accuracy for things like job class letters
             config = r'--oem 3 --psm 10'
-            text = pytesseract.image_to_string(img, config=config).strip()
+            text = get_ocr_engine().image_to_string(img, config=config).strip()
 
             if was_visible:
                 self.overlay_window.root.deiconify()
@@ -435,7 +501,7 @@ class AutomationDesignerUI:
                 win_x, win_y, _, _ = self.aden_window_region
                 rel_x, rel_y, w, h = (self.left_var.get(), self.top_var.get(), self.width_var.get(), self.height_var.get())
                 abs_region = (win_x + rel_x, win_y + rel_y, w, h)
-                pov_img = pyautogui.screenshot(region=abs_region)
+                pov_img = Image.fromarray(screen_capture.grab(abs_region))
             except Exception:
                 pov_img = None
 
@@ -465,7 +531,7 @@ class AutomationDesignerUI:
         rel_x, rel_y, w, h = (self.left_var.get(), self.top_var.get(), self.width_var.get(), self.height_var.get())
         abs_region = (win_x + rel_x, win_y + rel_y, w, h)
         try:
-            pov_img = pyautogui.screenshot(region=abs_region)
+            pov_img = Image.fromarray(screen_capture.grab(abs_region))
             self.update_image_label(self.pov_image_label, pov_img)
         except Exception:
             self.pov_image_label.config(image='')
@@ -532,7 +598,7 @@ class AutomationDesignerUI:
         capture_region = (win_x + rel_x, win_y + rel_y, w, h)
 
         try:
-            img = pyautogui.screenshot(region=capture_region)
+            img = Image.fromarray(screen_capture.grab(capture_region))
             self.logger.debug(f"Attempting to save screenshot to: {ref_path!r}")
             img.save(ref_path)
             messagebox.showinfo("Success", "Reference image has been recaptured and saved.")
@@ -589,169 +655,31 @@ class AutomationDesignerUI:
         self.stop_btn.config(state=tk.NORMAL if self.is_test_running else tk.DISABLED)
 
     def run_test_sequence(self, start_index=0, data_context={}):
-        steps_to_run = self.automation_steps[start_index:]
-        all_item_ids = self.sequencer_tree.get_children()
-
-        for i, step in enumerate(steps_to_run):
-            if self.stop_test_event.is_set():
-                self.logger.warning("Test run stopped by user.")
-                break
-
-            item_id = all_item_ids[start_index + i]
-            self.root.after(0, lambda id=item_id: self.sequencer_tree.item(id, tags=('running',)))
-
-            action = step["action"]
-            target = step.get("target_image")
-            params = step.get("parameters", {})
-            self.logger.info(f"Executing step {step['step']}: {action} on target {target}")
-
-            # The data_context is passed to the execution function
-            success = self._execute_single_step(action, target, params, data_context)
-
-            tag = 'success' if success else 'failure'
-            self.root.after(0, lambda id=item_id, t=tag: self.sequencer_tree.item(id, tags=(t,)))
-
-            if not success:
-                self.logger.error("Stopping test run due to step failure.")
-                break
-            time.sleep(0.5)
+        # Runs through the same compiler and engine as the app, so timings here carry over
+        try:
+            sequence = compile_sequence({"steps": self.automation_steps}, self.engine.actions, "Test sequence")
+        except SequenceError as e:
+            problems = str(e)
+            self.logger.error(problems)
+            self.root.after(0, lambda: messagebox.showerror("Invalid Sequence", problems))
+        else:
+            self._test_item_ids = self.sequencer_tree.get_children()
+            self.engine.run(sequence.steps[start_index:], data_context, stop_event=self.stop_test_event, label="test run")
+            self.logger.info(f"Resulting data context: {data_context}")
 
         self.is_test_running = False
         self.root.after(0, self.update_runner_buttons)
         self.logger.info("Test run finished.")
 
-    def _execute_single_step(self, action, target, params, data_context):
-        """Executes a single automation step and returns its success status."""
-        try:
-            if action == "type_from_context":
-                key = params.get("param1")
-                if not key:
-                    self.logger.error("Action 'type_from_context' requires a key in Parameter 1.")
-                    return False
-
-                if key in data_context:
-                    value_to_type = str(data_context[key])
-                    self.logger.info(f"Typing value from context. Key: '{key}', Value: '{value_to_type}'")
-                    pyautogui.write(value_to_type, interval=0.05)
-                    return True
-                else:
-                    self.logger.error(f"Error: Key '{key}' not found in the provided test context.")
-                    return False
-
-            elif action == "count_list_items":
-                input_key = params.get("param1")
-                output_key = params.get("param2")
-                if not input_key or not output_key:
-                    self.logger.error("Action 'count_list_items' requires an input key (Param1) and an output key (Param2).")
-                    return False
-
-                input_list = data_context.get(input_key)
-                if not isinstance(input_list, list):
-                    self.logger.error(f"Error: Key '{input_key}' in context is not a list.")
-                    return False
-
-                count = len(input_list)
-                data_context[output_key] = count
-                self.logger.info(f"Counted {count} items in '{input_key}'. Stored result in new context variable '{output_key}'.")
-                return True
-
-            elif action == "press_key_context":
-                key_to_press = params.get("param1")
-                count_key = params.get("param2")
-                if not key_to_press or not count_key:
-                    self.logger.error("Action 'press_key_context' requires a key to press (Param1) and a context variable for the count (Param2).")
-                    return False
-
-                press_count = data_context.get(count_key)
-                if not isinstance(press_count, int):
-                    self.logger.error(f"Error: Count variable '{count_key}' in context is not an integer.")
-                    return False
-
-                self.logger.info(f"Pressing key '{key_to_press}' {press_count} times.")
-                pyautogui.press(key_to_press, presses=press_count)
-                return True
-
-            # --- NEWLY ADDED OCR CAPTURE LOGIC FOR DEBUGGER ---
-            elif action == "ocr_capture":
-                output_key = params.get("param1")
-                if not output_key:
-                    self.logger.error("Action 'ocr_capture' requires an output key in Parameter 1.")
-                    return False
-
-                absolute_region = get_region(target)
-                self.logger.info(f"Performing OCR capture on region '{target}' at {absolute_region}")
-                img = pyautogui.screenshot(region=absolute_region)
-                text = pytesseract.image_to_string(img).strip()
-                if text:
-                    data_context[output_key] = text.split('\n')
-                else:
-                    data_context[output_key] = []  # Return an empty list if no text was found
-                # For testing, we'll just split the text into lines
-                data_context[output_key] = text.strip().split('\n')
-                self.logger.info(f"OCR captured {len(data_context[output_key])} lines into context variable '{output_key}'.")
-                return True
-            # --- END OF NEW LOGIC ---
-
-            elif action == "click_center": return find_and_click(target)
-            elif action == "right_click_center": return find_and_right_click(target)
-            elif action == "double_click_center": return find_and_click(target, clicks=2)
-            elif action == "click_offset":
-                x = int(params.get("param1", 0))
-                y = int(params.get("param2", 0))
-                return find_label_and_click_offset(target, x_offset=x, y_offset=y)
-            elif action == "double_click_offset":
-                x = int(params.get("param1", 0))
-                y = int(params.get("param2", 0))
-                return find_and_double_click_offset(target, x_offset=x, y_offset=y)
-            elif action == "move_to_target": return find_and_move_to(target)
-            elif action == "type_text":
-                pyautogui.write(params.get("param1", ""), interval=0.05)
-                return True
-            elif action == "press_key":
-                pyautogui.press(params.get("param1", "enter"))
-                return True
-
-            elif action == "paste_from_clipboard": return paste_from_clipboard()
-            elif action == "sleep":
-                time.sleep(float(params.get("param1", 1.0)))
-                return True
-            elif action == "wait_for_target":
-                timeout = int(params.get("param1", 10))
-                return wait_for_image(target, timeout)
-            elif action == "scroll_mouse":
-                amount = int(params.get("param1", 0))
-                pyautogui.scroll(amount)
-                return True
-            elif action == "find_image_in_region":
-                secondary_action = params.get("param1", "click")
-
-                if not target:
-                    self.logger.error("Action 'find_image_in_region' requires a target to be selected from the 'Select Target' combobox.")
-                    return False
-
-                self.logger.info(f"Finding image '{target}' in ADEN window region and performing '{secondary_action}'")
-                result = find_image_in_region(target, target, secondary_action)
-
-                # If the secondary action is "get_text" and text was found, store it in the context
-                if secondary_action == "get_text" and result and isinstance(result, str):
-                    output_key = f"{target}_text"
-                    data_context[output_key] = result
-                    self.logger.info(f"Stored extracted text in context variable '{output_key}'")
-
-                return result if isinstance(result, bool) else bool(result)
-            elif action == "type_current_date":
-                # Get the current date and format it
-                date_format = params.get("param1", "%d/%m/%Y")  # Default format: DD/MM/YYYY
-                current_date = datetime.datetime.now().strftime(date_format)
-                self.logger.info(f"Typing current date: {current_date}")
-                pyautogui.write(current_date, interval=0.05)
-                return True
-            else:
-                self.logger.warning(f"Action '{action}' is not implemented.")
-                return False
-        except Exception as e:
-            self.logger.error(f"Error during step execution: {e}", exc_info=True)
-            return False
+    def _on_step_start(self, step):
+        item_id = self._test_item_ids[step.index - 1]
+        self.root.after(0, lambda: self.sequencer_tree.item(item_id, tags=('running',)))
+
+    def _on_step_end(self, step, success, elapsed):
+        item_id = self._test_item_ids[step.index - 1]
+        tag = 'success' if success else 'failure'
+        self.root.after(0, lambda: self.sequencer_tree.item(item_id, tags=(tag,)))
+        self.logger.info(f"Step {step.index} ({step.action}) took {elapsed * 1000:.0f}ms.")
 
     def on_step_select(self, event):
         selected_items = self.sequencer_tree.selection()
@@ -767,6 +695,7 @@ class AutomationDesignerUI:
             self.active_target_var.set(step_data.get("target_image") or "")
             self.param1_var.set(step_data.get("parameters", {}).get("param1", ""))
             self.param2_var.set(step_data.get("parameters", {}).get("param2", ""))
+            self.post_var.set(step_data.get("post", ""))
         except IndexError:
             self.logger.error(f"Failed to load step data for index {selected_index}")
 
@@ -777,7 +706,15 @@ class AutomationDesignerUI:
         params = {}
         if self.param1_var.get(): params['param1'] = self.param1_var.get()
         if self.param2_var.get(): params['param2'] = self.param2_var.get()
-        return {"action": action, "target_image": target, "parameters": params, "on_failure": "stop_with_error"}
+        step = {"action": action, "target_image": target, "parameters": params, "on_failure": "stop_with_error"}
+        post = self.post_var.get().strip()
+        if post:
+            try:
+                parse_post(post)
+                step["post"] = post
+            except ValueError as e:
+                messagebox.showwarning("Invalid Wait After", f"Ignoring '{post}' ({e}); using the action's default.")
+        return step
 
     def insert_step_above(self):
         """Inserts a new step before the selected step in the list."""
@@ -873,6 +810,8 @@ class AutomationDesignerUI:
             step['step'] = i + 1
             step['name'] = f"Step {i+1}: {step['action']}"
             params_str = json.dumps(step.get('parameters', {})) if step.get('parameters') else ""
+            if step.get('post'):
+                params_str = f"{params_str} post={step['post']}".strip()
             self.sequencer_tree.insert("", "end", values=(step['step'], step['action'], step.get('target_image') or "N/A", params_str))
 
     def save_search_coords(self):
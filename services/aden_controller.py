@@ -9,43 +9,30 @@ import pyperclip
 # Updated import paths for the new structure
 from core import db
 from services.aden_automation import enter_job_ref, clipboard_copy
+from services.aden_state import classify_aden_state, wait_for_state
 from utils.automation_helpers import (
     find_and_click,
     find_label_and_click_offset,
-    get_region,
-    IMAGE_ASSETS,
-    CONFIDENCE_LEVEL,
 )
 
 logger = logging.getLogger(__name__)
+JOB_CARD_LOAD_TIMEOUT = 5
 
 # --- ADEN STATE DETECTION ---
 def check_aden_state() -> str:
     """
-    Determines ADEN state by searching for images within calibrated regions.
-    Returns 'job_card_loaded', 'ready', or 'unknown'.
+    Determines ADEN state by scoring every known screen signature against a
+    single capture of the window. Returns e.g. 'job_card_loaded', 'ready',
+    a popup state, or 'unknown'.
     """
-    # Check for loaded warranty job
     try:
-        img_path = IMAGE_ASSETS["JOB_CLASS_WARRANTY_IMG"]
-        region = get_region("JOB_CLASS_WARRANTY_IMG")
-        if pyautogui.locateOnScreen(img_path, region=region,
-                                    confidence=CONFIDENCE_LEVEL, grayscale=True):
-            return "job_card_loaded"
+        state, confidences = classify_aden_state()
+        scores = {name: round(score, 2) for name, score in confidences.items()}
+        logger.debug(f"ADEN state scores: {scores}")
+        return state
     except Exception as e:
-        logger.error(f"Error detecting loaded warranty state: {e}", exc_info=True)
-
-    # Check for empty (ready) state
-    try:
-        img_path = IMAGE_ASSETS["JOB_CLASS_EMPTY_IMG"]
-        region = get_region("JOB_CLASS_EMPTY_IMG")
-        if pyautogui.locateOnScreen(img_path, region=region,
-                                    confidence=CONFIDENCE_LEVEL, grayscale=True):
-            return "ready"
-    except Exception as e:
-        logger.error(f"Error detecting ready state: {e}", exc_info=True)
-
-    return "unknown"
+        logger.error(f"Error detecting ADEN state: {e}", exc_info=True)
+        return "unknown"
 
 
 # --- ERROR HANDLING ---
@@ -65,9 +52,10 @@ def load_job_card(job_ref: str) -> bool:
     logger.info(f"--- Task: Loading Job Card {job_ref} ---")
     if not enter_job_ref(job_ref):
         return False
-    time.sleep(1)  # Wait a moment for UI to update
 
-    state = check_aden_state()
+    # Returns as soon as the card shows up, or early if a popup/prompt appears instead
+    state = wait_for_state({"job_card_loaded"}, timeout=JOB_CARD_LOAD_TIMEOUT,
+                           fail_states={"add_item_popup", "add_quotes_popup", "save_prompt"})
     if state == "job_card_loaded":
         logger.info("✅ Job card loaded successfully.")
         return True
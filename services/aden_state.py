@@ -0,0 +1,167 @@
+# aden_state.py
+"""
+ADEN screen-state classification.
+
+Each known screen is described by a signature in STATE_SIGNATURES. One
+capture of the ADEN window is taken and every signature is scored against
+it: templates are matched inside their calibrated region (a slice of the
+same capture, fanned out over the match thread pool) and pixel probes are
+checked together in a single numpy gather. The best-scoring state above the
+confidence level wins.
+"""
+import time
+import logging
+
+import numpy as np
+
+from utils.automation_helpers import (
+    find_aden_window,
+    capture_region,
+    SEARCH_REGIONS,
+    TEMPLATES,
+    MATCH_CACHE,
+    CONFIDENCE_LEVEL,
+    MIN_POLL_INTERVAL,
+    POLL_INTERVAL,
+    CHANGE_THRESHOLD,
+)
+from utils.match_executor import get_match_executor
+from utils.vision import to_gray
+from utils.waiting import ChangeDetector, Backoff
+
+logger = logging.getLogger(__name__)
+
+# --- STATE SIGNATURES ---
+# "templates": asset keys searched inside their calibrated region (whole window if uncalibrated).
+# "match":     "all" -> state score is the weakest template score, "any" -> the strongest.
+# "probes":    optional [(x, y, (r, g, b), tolerance), ...] window-relative pixel checks; the
+#              probe score is the fraction of probes within tolerance.
+STATE_SIGNATURES = {
+    "job_card_loaded": {"templates": ["JOB_CLASS_WARRANTY_IMG"], "match": "all"},
+    "ready": {"templates": ["JOB_CLASS_EMPTY_IMG"], "match": "all"},
+    "add_item_popup": {"templates": ["LABEL_POPUP_ITEM_DESC_IMG", "BUTTON_POPUP_SAVE_IMG"], "match": "all"},
+    "add_quotes_popup": {"templates": ["TITLE_ADD_QUOTES_IMG"], "match": "all"},
+    "save_prompt": {"templates": ["NO_BUTTON_IMG"], "match": "all"},
+}
+
+
+def _template_slice(key: str, window_gray: np.ndarray) -> np.ndarray:
+    """The calibrated slice of the window capture that `key` is searched in."""
+    region = SEARCH_REGIONS.get(key)
+    if not region:
+        return window_gray
+    top, left = region["top"], region["left"]
+    return window_gray[top:top + region["height"], left:left + region["width"]]
+
+
+def _template_scores(keys, window_gray: np.ndarray) -> dict:
+    """
+    Matches every template in its slice of the capture concurrently, skipping slices
+    whose pixels were already matched. Returns {key: confidence}.
+    """
+    jobs, scores, cache_keys = [], {}, {}
+    for key in keys:
+        try:
+            template = TEMPLATES.get(key)
+        except Exception as e:
+            logger.debug(f"State template '{key}' unavailable: {e}")
+            scores[key] = 0.0
+            continue
+        haystack = _template_slice(key, window_gray)
+        cache_keys[key] = MATCH_CACHE.key_for(key, TEMPLATES.version(key), haystack)
+        cached = MATCH_CACHE.get(cache_keys[key])
+        if cached is not None:
+            scores[key] = cached[0]
+        else:
+            jobs.append((key, haystack, template))
+    for key, score, loc in get_match_executor().match_many(jobs):
+        MATCH_CACHE.put(cache_keys[key], (score, loc))
+        scores[key] = score
+    return scores
+
+
+def _probe_scores(window_rgb: np.ndarray, signatures: dict) -> dict:
+    """Evaluates every signature's pixel probes in one vectorised gather."""
+    owners, xs, ys, colours, tolerances = [], [], [], [], []
+    for state, signature in signatures.items():
+        for x, y, colour, tolerance in signature.get("probes", []):
+            owners.append(state); xs.append(x); ys.append(y)
+            colours.append(colour); tolerances.append(tolerance)
+    if not owners:
+        return {}
+
+    xs = np.clip(np.array(xs), 0, window_rgb.shape[1] - 1)
+    ys = np.clip(np.array(ys), 0, window_rgb.shape[0] - 1)
+    pixels = window_rgb[ys, xs].astype(np.int16)
+    hits = np.abs(pixels - np.array(colours, dtype=np.int16)).max(axis=1) <= np.array(tolerances)
+
+    owners = np.array(owners)
+    return {state: float(hits[owners == state].mean()) for state in set(owners.tolist())}
+
+
+def score_states(window_rgb: np.ndarray, signatures: dict = None) -> dict:
+    """Scores every signature against one RGB capture of the ADEN window. Returns {state: confidence}."""
+    signatures = signatures or STATE_SIGNATURES
+    window_gray = to_gray(window_rgb)
+    probe_scores = _probe_scores(window_rgb, signatures)
+
+    keys = {key for signature in signatures.values() for key in signature.get("templates", [])}
+    template_scores = _template_scores(keys, window_gray)
+
+    confidences = {}
+    for state, signature in signatures.items():
+        parts = []
+        keys = signature.get("templates", [])
+        if keys:
+            scores = [template_scores[key] for key in keys]
+            parts.append(max(scores) if signature.get("match") == "any" else min(scores))
+        if state in probe_scores:
+            parts.append(probe_scores[state])
+        confidences[state] = sum(parts) / len(parts) if parts else 0.0
+    return confidences
+
+
+def classify_aden_state(window_rgb: np.ndarray = None) -> tuple[str, dict]:
+    """
+    Classifies the current ADEN screen from a single capture.
+
+    Returns:
+        tuple: (best state or 'unknown', {state: confidence}).
+    """
+    if window_rgb is None:
+        window = find_aden_window()
+        if not window:
+            return "unknown", {}
+        window_rgb = capture_region(window, newer_than=time.time())
+
+    confidences = score_states(window_rgb)
+    best_state = max(confidences, key=confidences.get) if confidences else None
+    if best_state is None or confidences[best_state] < CONFIDENCE_LEVEL:
+        return "unknown", confidences
+    return best_state, confidences
+
+
+def wait_for_state(states, timeout: float = 10, fail_states=()) -> str:
+    """
+    Waits until ADEN is in one of `states` (or in one of `fail_states`, which ends
+    the wait early). Classification only re-runs when the window's pixels change.
+    Returns the last classified state.
+    """
+    states, fail_states = set(states), set(fail_states)
+    changes = ChangeDetector(CHANGE_THRESHOLD)
+    backoff = Backoff(MIN_POLL_INTERVAL, POLL_INTERVAL)
+    state = "unknown"
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        window = find_aden_window()
+        if window:
+            window_rgb = capture_region(window, newer_than=time.time())
+            if changes.changed(to_gray(window_rgb), key=window):
+                backoff.reset()
+                state, confidences = classify_aden_state(window_rgb)
+                if state in states or state in fail_states:
+                    logger.info(f"ADEN state: '{state}' ({confidences.get(state, 0.0):.2f})")
+                    return state
+        time.sleep(max(0.0, min(backoff.next(), end_time - time.time())))
+    logger.warning(f"Timed out after {timeout}s waiting for ADEN state {sorted(states)}; last state '{state}'.")
+    return state
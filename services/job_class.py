@@ -0,0 +1,94 @@
+# job_class.py
+"""
+Job class detection by template classification.
+
+The job class is a single letter drawn in a fixed font next to the job card's
+class field. Rather than asking Tesseract to read one character, the field's
+ROI is captured once and scored against every class letter template in one
+pass on the match pool; the best template above the confidence level is the
+class. Letters without a reference image yet fall through to OCR.
+"""
+import time
+import logging
+
+from utils.automation_helpers import (
+    find_aden_window,
+    capture_region,
+    SEARCH_REGIONS,
+    TEMPLATES,
+)
+from utils.match_executor import get_match_executor
+from utils.ocr_cache import ink_mask
+from utils.vision import to_gray
+
+logger = logging.getLogger(__name__)
+
+# Class letter -> job class name stored in the database.
+JOB_CLASS_MAP = {
+    'C': 'Cash Sale',
+    'E': 'Workshop Job',
+    'J': 'Jobs Completed',
+    'Q': 'Quote',
+    'F': 'Warranty Jobs'
+}
+# Class letter -> reference image key.
+JOB_CLASS_TEMPLATES = {
+    "E": "JOB_CLASS_E",
+    "F": "JOB_CLASS_F",
+    "Q": "JOB_CLASS_Q",
+}
+JOB_CLASS_ROI_KEY = "JOB_CLASS_COND"
+ROI_PAD = 6
+# Letters share strokes (F is most of an E), so demand a high score and a clear lead over the
+# runner-up; letters without a template (C, J) must fall through to OCR rather than match E.
+JOB_CLASS_CONFIDENCE = 0.92
+JOB_CLASS_MARGIN = 0.05
+
+
+def job_class_roi(roi_key: str = JOB_CLASS_ROI_KEY) -> tuple | None:
+    """
+    Window-relative (left, top, width, height) covering the class field and every class
+    template's calibrated region, padded so small shifts still fit.
+    """
+    regions = [SEARCH_REGIONS[key] for key in [roi_key, *JOB_CLASS_TEMPLATES.values()] if key in SEARCH_REGIONS]
+    if not regions:
+        return None
+    left = max(0, min(r["left"] for r in regions) - ROI_PAD)
+    top = max(0, min(r["top"] for r in regions) - ROI_PAD)
+    right = max(r["left"] + r["width"] for r in regions) + ROI_PAD
+    bottom = max(r["top"] + r["height"] for r in regions) + ROI_PAD
+    return left, top, right - left, bottom - top
+
+
+def classify_job_class(roi_key: str = JOB_CLASS_ROI_KEY, confidence: float = JOB_CLASS_CONFIDENCE) -> tuple[str | None, float, dict]:
+    """
+    Captures the job class field and scores it against all class templates at once.
+
+    Returns:
+        tuple: (letter, confidence, {letter: score}). The letter is "" for an empty
+        field and None if no template is confident (the caller should fall back to OCR).
+    """
+    window = find_aden_window()
+    roi = job_class_roi(roi_key)
+    if not window or not roi:
+        return None, 0.0, {}
+    region = (window[0] + roi[0], window[1] + roi[1], roi[2], roi[3])
+    gray = to_gray(capture_region(region, newer_than=time.time()))
+    if ink_mask(gray) is None:
+        return "", 1.0, {}
+
+    jobs = []
+    for letter, key in JOB_CLASS_TEMPLATES.items():
+        try:
+            jobs.append((letter, gray, TEMPLATES.get(key)))
+        except Exception as e:
+            logger.debug(f"Job class template '{key}' unavailable: {e}")
+    scores = {letter: score for letter, score, _ in get_match_executor().match_many(jobs)}
+    if not scores:
+        return None, 0.0, scores
+    ranked = sorted(scores.values(), reverse=True)
+    best = max(scores, key=scores.get)
+    runner_up = ranked[1] if len(ranked) > 1 else 0.0
+    if scores[best] < confidence or scores[best] - runner_up < JOB_CLASS_MARGIN:
+        return None, scores[best], scores
+    return best, scores[best], scores
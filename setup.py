@@ -24,6 +24,7 @@ data_files = [
     ('AutoSequenceRepo', 'AutoSequenceRepo'),
     ('search_regions.json', '.'),
     ('user_assets.json', '.'),
+    ('model_prefixes.json', '.'),
     ('requirements.txt', '.')
 ]
 
@@ -0,0 +1,6 @@
+# conftest.py
+"""Makes the application packages (core, services, utils, ...) importable from the tests."""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,27 @@
+# test_debug_capture_store.py
+import numpy as np
+
+from utils.debug_capture_store import DebugCaptureStore
+
+CROP = np.tile(np.arange(0, 200, 10, dtype=np.uint8), (12, 1))
+
+
+def test_failure_mode_keeps_only_failed_jobs(tmp_path):
+    store = DebugCaptureStore(str(tmp_path / "captures.db"), mode="failure")
+    store.submit("J1", "customer_no", CROP)
+    store.submit("J2", "customer_no", CROP)
+    store.finish_job("J1", success=True)
+    store.finish_job("J2", success=False)
+    store.flush()
+    assert store.fetch("J1") == []
+    assert [(field, status) for field, _, status, _ in store.fetch("J2")] == [("customer_no", "job_failed")]
+
+
+def test_all_mode_keeps_successful_captures(tmp_path):
+    store = DebugCaptureStore(str(tmp_path / "captures.db"), mode="all")
+    store.submit("J1", "customer_no", CROP)
+    store.finish_job("J1", success=True)
+    store.flush()
+    (field, _, status, image), = store.fetch("J1")
+    assert (field, status) == ("customer_no", "ok")
+    assert np.array_equal(image, CROP)
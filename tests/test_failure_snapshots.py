@@ -0,0 +1,15 @@
+# test_failure_snapshots.py
+import os
+
+import numpy as np
+
+from utils.failure_snapshots import FailureSnapshotWriter
+
+
+def test_clear_removes_only_snapshots(tmp_path):
+    writer = FailureSnapshotWriter(str(tmp_path), min_interval=0)
+    assert writer.submit("NO_BUTTON_IMG", np.zeros((10, 10, 3), np.uint8))
+    assert writer.submit("SAVE_BUTTON_IMG", np.full((10, 10, 3), 255, np.uint8))
+    (tmp_path / "notes.txt").write_text("keep")
+    assert writer.clear() == 2
+    assert os.listdir(tmp_path) == ["notes.txt"]
@@ -0,0 +1,98 @@
+# test_find_helpers.py
+"""Drives the find_* helpers headlessly against a FakeScreen desktop."""
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("pyautogui")
+
+from utils import automation_helpers as helpers  # noqa: E402
+from utils import screen_capture  # noqa: E402
+from utils.failure_snapshots import FailureSnapshotWriter  # noqa: E402
+from utils.location_priors import LocationPriors  # noqa: E402
+from utils.region_stats import MatchLog  # noqa: E402
+from utils.window_tracker import WindowTracker  # noqa: E402
+
+WINDOW = (120, 90)  # Where the ADEN anchor (the window's top-left) is drawn on the fake desktop
+
+
+def asset(key: str) -> np.ndarray:
+    return cv2.cvtColor(cv2.imread(helpers.IMAGE_ASSETS[key]), cv2.COLOR_BGR2RGB)
+
+
+def paste_in_region(screen: screen_capture.FakeScreen, key: str) -> tuple:
+    """Draws `key`'s reference image centred in its search region; returns its expected centre."""
+    region = helpers.SEARCH_REGIONS[key]
+    image = asset(key)
+    left = WINDOW[0] + region["left"] + max(0, region["width"] - image.shape[1]) // 2
+    top = WINDOW[1] + region["top"] + max(0, region["height"] - image.shape[0]) // 2
+    screen.paste(image, (left, top))
+    return left + image.shape[1] // 2, top + image.shape[0] // 2
+
+
+@pytest.fixture
+def screen(tmp_path, monkeypatch):
+    """A noisy fake desktop holding the ADEN anchor; persisted state goes to `tmp_path`."""
+    desktop = np.random.default_rng(0).integers(150, 230, (800, 1280, 3), dtype=np.uint8)
+    screen = screen_capture.FakeScreen(desktop)
+    screen.paste(asset("ADEN_WINDOW_ANCHOR_IMG"), WINDOW)
+    screen_capture.set_backend(screen)
+    monkeypatch.setattr(helpers, "WINDOW_TRACKER", WindowTracker(
+        anchor_provider=lambda: helpers.TEMPLATES.get("ADEN_WINDOW_ANCHOR_IMG"),
+        capture_gray=screen_capture.grab_gray,
+        finder=helpers._search_aden_window,
+        state_path=str(tmp_path / "aden_window_state.json"),
+        window_size=helpers.ADEN_WINDOW_SIZE,
+        confidence=helpers.ADEN_ANCHOR_CONFIDENCE,
+    ))
+    monkeypatch.setattr(helpers, "LOCATION_PRIORS", LocationPriors(str(tmp_path / "location_priors.json")))
+    monkeypatch.setattr(helpers, "MATCH_LOG", MatchLog(str(tmp_path / "match_log.jsonl")))
+    monkeypatch.setattr(helpers, "FAILURE_SNAPSHOTS", FailureSnapshotWriter(str(tmp_path / "debug_images")))
+    yield screen
+    screen_capture.set_backend(None)
+
+
+def test_window_is_found_at_the_anchor(screen):
+    assert helpers.find_aden_window()[:2] == WINDOW
+
+
+def test_poll_finds_a_visible_target(screen):
+    centre = paste_in_region(screen, "NO_BUTTON_IMG")
+    match = helpers._poll_for_match("NO_BUTTON_IMG", 2, "test")
+    assert match is not None
+    assert abs(match.x - centre[0]) <= 1 and abs(match.y - centre[1]) <= 1
+    assert match.confidence >= helpers.CONFIDENCE_LEVEL
+
+
+def test_wait_for_image_sees_a_target_that_appears_later(screen):
+    timer = threading.Timer(0.3, paste_in_region, (screen, "SAVE_BUTTON_IMG"))
+    timer.start()
+    try:
+        assert helpers.wait_for_image("SAVE_BUTTON_IMG", timeout=3)
+    finally:
+        timer.cancel()
+
+
+def test_wait_for_image_times_out_without_the_target(screen):
+    assert not helpers.wait_for_image("NO_BUTTON_IMG", timeout=0.5)
+
+
+def test_settle_waits_for_a_redraw_to_start(screen):
+    started = time.time()
+    assert helpers.wait_for_settle(first_change=0.5)
+    assert time.time() - started >= 0.5
+
+
+def test_settle_returns_once_the_redraw_is_over(screen):
+    redraw = np.zeros((100, 200, 3), np.uint8)
+    timer = threading.Timer(0.1, screen.paste, (redraw, (WINDOW[0] + 300, WINDOW[1] + 200)))
+    timer.start()
+    started = time.time()
+    try:
+        assert helpers.wait_for_settle(first_change=1.5)
+    finally:
+        timer.cancel()
+    assert time.time() - started < 1.0
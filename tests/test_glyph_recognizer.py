@@ -0,0 +1,42 @@
+# test_glyph_recognizer.py
+import cv2
+import numpy as np
+import pytest
+
+from utils.glyph_recognizer import GlyphRecognizer
+
+
+def render(text: str) -> np.ndarray:
+    """A dark-on-light single-line crop of `text` in a fixed font, without anti-aliasing."""
+    image = np.full((30, 12 * len(text) + 20), 255, np.uint8)
+    cv2.putText(image, text, (5, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1, cv2.LINE_8)
+    return image
+
+
+@pytest.fixture
+def recognizer(tmp_path):
+    recognizer = GlyphRecognizer(str(tmp_path / "glyph_templates.npz"))
+    assert recognizer.learn(render("12 MAR 2024"), "12 MAR 2024")
+    return recognizer
+
+
+def test_recognize_keeps_word_spaces(recognizer):
+    text, confidence = recognizer.recognize(render("12 MAR 2024"))
+    assert text == "12 MAR 2024"
+    assert confidence >= recognizer.min_confidence
+
+
+def test_recognize_reorders_learned_glyphs(recognizer):
+    assert recognizer.recognize(render("21 RAM 4202"))[0] == "21 RAM 4202"
+
+
+def test_recognize_rejects_unknown_glyph(recognizer):
+    text, confidence = recognizer.recognize(render("12 MAY 2024"))
+    assert text is None
+    assert confidence < recognizer.min_confidence
+
+
+def test_templates_round_trip(recognizer):
+    recognizer.save()
+    reloaded = GlyphRecognizer(recognizer.path)
+    assert reloaded.recognize(render("12 MAR 2024"))[0] == "12 MAR 2024"
@@ -0,0 +1,37 @@
+# test_keyword_matcher.py
+import pytest
+
+pytest.importorskip("core.db")
+
+from utils.keyword_matcher import KeywordMatcher, TOOL_SUBJECT_KEYWORDS  # noqa: E402
+
+PREFIXES = {"Milwaukee": ["M12", "M18"], "Makita": ["DHP"]}
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(TOOL_SUBJECT_KEYWORDS, PREFIXES)
+
+
+def test_list_order_wins_within_a_line(matcher):
+    # "Milwaukee" appears later in the line but is listed before "Bosch".
+    assert matcher.find("Bosch charger for Milwaukee drill") == "Milwaukee"
+    assert matcher.find("hush150 with battery") == "Hush150"
+
+
+def test_keywords_win_over_model_prefixes(matcher):
+    assert matcher.find("M18 drill, Makita battery") == "Makita"
+
+
+def test_first_line_with_a_term_decides(matcher):
+    assert matcher.find("Customer notes\nBosch grinder\nMakita drill") == "Bosch"
+
+
+def test_model_prefixes_tag_their_brand(matcher):
+    assert matcher.find("M18FPD2 combi drill") == "Milwaukee"
+    assert matcher.find("dhp482 not charging") == "Makita"
+
+
+def test_terms_must_start_a_word(matcher):
+    assert matcher.find("XM18 adaptor, LEGO set") is None
+    assert matcher.find("") is None
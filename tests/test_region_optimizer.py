@@ -0,0 +1,41 @@
+# test_region_optimizer.py
+import json
+
+from utils.region_optimizer import ocr_region_keys, propose_regions
+
+REGIONS = {
+    "SAVE_BUTTON_IMG": {"left": 700, "top": 150, "width": 200, "height": 100},
+    "PRINTED_REF_NO": {"left": 50, "top": 60, "width": 300, "height": 30},
+}
+
+
+def boxes(left: int, top: int, width: int = 40, height: int = 20, count: int = 5) -> list:
+    return [(left, top, width, height)] * count
+
+
+def test_proposal_is_the_padded_union_of_matches():
+    proposal = propose_regions({"SAVE_BUTTON_IMG": boxes(800, 190)}, REGIONS, pad=10)["SAVE_BUTTON_IMG"]
+    assert proposal["proposed"] == {"left": 790, "top": 180, "width": 60, "height": 40}
+    assert proposal["speedup"] > 1
+
+
+def test_proposal_stays_inside_the_current_region():
+    proposal = propose_regions({"SAVE_BUTTON_IMG": boxes(702, 152)}, REGIONS, pad=10)["SAVE_BUTTON_IMG"]
+    assert proposal["proposed"] == {"left": 700, "top": 150, "width": 52, "height": 32}
+
+
+def test_excluded_and_sparse_keys_are_left_alone():
+    observed = {"PRINTED_REF_NO": boxes(55, 65), "SAVE_BUTTON_IMG": boxes(800, 190, count=4)}
+    assert propose_regions(observed, REGIONS, exclude={"PRINTED_REF_NO"}) == {}
+
+
+def test_ocr_region_keys_come_from_the_sequences(tmp_path):
+    steps = [
+        {"action": "ocr_capture", "target_image": "PRINTED_REF_NO", "parameters": {"param1": "job_ref"}},
+        {"action": "classify_job_class", "target_image": "", "parameters": {"param1": "Job_Class_Cond"}},
+        {"action": "find_image_in_region", "target_image": "HEADER_ITEM_DESC_IMG", "parameters": {"param1": "get_text"}},
+        {"action": "find_image_in_region", "target_image": "NO_BUTTON_IMG", "parameters": {"param1": "click"}},
+        {"action": "click_center", "target_image": "SAVE_BUTTON_IMG"},
+    ]
+    (tmp_path / "import.json").write_text(json.dumps({"task_name": "import", "steps": steps}))
+    assert ocr_region_keys(str(tmp_path)) == {"PRINTED_REF_NO", "JOB_CLASS_COND", "HEADER_ITEM_DESC_IMG"}
@@ -0,0 +1,24 @@
+# test_region_stats.py
+from utils.region_stats import MatchLog, read_match_boxes
+
+
+def test_recorded_boxes_are_read_back(tmp_path):
+    log = MatchLog(str(tmp_path / "match_log.jsonl"))
+    for i in range(50):
+        log.record("SAVE_BUTTON_IMG", 10 + i, 20, 30, 12, 0.95)
+    log.record("NO_BUTTON_IMG", 5, 6, 7, 8, 0.9)
+    log.flush()
+    boxes = read_match_boxes(log.path)
+    assert boxes["SAVE_BUTTON_IMG"] == [(10 + i, 20, 30, 12) for i in range(50)]
+    assert boxes["NO_BUTTON_IMG"] == [(5, 6, 7, 8)]
+
+
+def test_rotated_generation_is_still_read(tmp_path):
+    log = MatchLog(str(tmp_path / "match_log.jsonl"), max_bytes=200)
+    for i in range(20):
+        log.record("SAVE_BUTTON_IMG", i, 0, 30, 12, 0.95)
+        log.flush()
+    assert (tmp_path / "match_log.jsonl.1").exists()
+    # Only one previous generation is kept, so the oldest boxes are gone but the newest remain.
+    lefts = [box[0] for box in read_match_boxes(log.path)["SAVE_BUTTON_IMG"]]
+    assert lefts == sorted(lefts) and lefts[-1] == 19
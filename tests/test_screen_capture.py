@@ -0,0 +1,21 @@
+# test_screen_capture.py
+import numpy as np
+
+from utils.screen_capture import FakeScreen
+
+
+def test_grab_pads_off_screen_area_with_black():
+    screen = FakeScreen(np.full((100, 200, 3), 200, np.uint8))
+    grabbed = screen.grab((190, -5, 20, 10))
+    assert grabbed.shape == (10, 20, 3)
+    assert (grabbed[5:, :10] == 200).all()
+    assert (grabbed[:5] == 0).all() and (grabbed[:, 10:] == 0).all()
+
+
+def test_paste_changes_later_captures():
+    screen = FakeScreen(np.zeros((50, 50), np.uint8))
+    before = screen.grab_gray((10, 10, 5, 5))
+    screen.paste(np.full((5, 5), 255, np.uint8), (10, 10))
+    assert (before == 0).all()
+    assert (screen.grab_gray((10, 10, 5, 5)) == 255).all()
+    assert screen.desktop_bounds() == (0, 0, 50, 50)
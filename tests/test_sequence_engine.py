@@ -0,0 +1,69 @@
+# test_sequence_engine.py
+"""Runs OCR capture steps through the engine with the screen, OCR and debug store replaced."""
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyautogui")
+pytest.importorskip("core.db")
+
+from utils import sequence_engine  # noqa: E402
+from utils.ocr_engine import OcrResult  # noqa: E402
+from utils.sequence_compiler import Post, Step  # noqa: E402
+
+READS = {"job_ref": "AB123456", "descriptions": "M18 drill\nno power"}
+
+
+class ImmediateOcr:
+    """Runs submitted reads on the calling thread."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class RecordingCaptures:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, job_ref, field, image, status="ok"):
+        self.submitted.append((job_ref, field))
+
+
+def ocr_step(index: int, target: str, key: str) -> Step:
+    return Step(index, "", "ocr_capture", target, {"param1": key}, "stop_with_error", Post("none"))
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(sequence_engine, "get_region", lambda key: (0, 0, 20, 10))
+    monkeypatch.setattr(sequence_engine, "capture_region", lambda region, **_: np.zeros((10, 20, 3), np.uint8))
+    monkeypatch.setattr(sequence_engine, "get_ocr_engine", lambda: ImmediateOcr())
+    monkeypatch.setattr(sequence_engine, "read_field_confident",
+                        lambda image, field, **_: (OcrResult(READS[field], 95.0, 0.0, "test"), 0))
+    return sequence_engine.SequenceEngine(debug_captures=RecordingCaptures())
+
+
+def test_captures_are_filed_under_the_run_job_ref(engine):
+    steps = [ocr_step(1, "PRINTED_REF_NO", "job_ref"), ocr_step(2, "ITEM_TEXT_BOX_FULL", "descriptions")]
+    data_context = {"job_ref": "AB123456"}
+    assert engine.run(steps, data_context)
+    assert engine.debug_captures.submitted == [("AB123456", "job_ref"), ("AB123456", "descriptions")]
+    assert data_context["descriptions"] == ["M18 drill", "no power"]
+    assert data_context["tool_subject"] == "Milwaukee"
+
+
+def test_failed_description_read_leaves_a_list(engine, monkeypatch):
+    def fail(image, field, **_):
+        raise RuntimeError("tesseract crashed")
+    monkeypatch.setattr(sequence_engine, "read_field_confident", fail)
+    count = Step(2, "", "count_list_items", None, {"param1": "descriptions", "param2": "line_count"},
+                 "stop_with_error", Post("none"))
+    data_context = {"job_ref": "AB123456"}
+    assert engine.run([ocr_step(1, "ITEM_TEXT_BOX_FULL", "descriptions"), count], data_context)
+    assert data_context["descriptions"] == [] and data_context["line_count"] == 0
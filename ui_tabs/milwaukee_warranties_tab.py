@@ -90,8 +90,10 @@ class MilwaukeeWarrantiesTab(ttk.Frame):
         """Fetches and displays all open Milwaukee warranty jobs."""
         self.available_list.delete(0, tk.END)
 
-        # Use our advanced search function to find the specific jobs
-        results = db.search_jobs(search_term="Milwaukee", filters=["Open Warranties"])
+        # Jobs are tagged with their tool subject on import (python -m utils.keyword_matcher tags older ones)
+        results = [job for job in db.get_all_jobs(full=True)
+                   if (job.get('tool_subject') or '').lower() == 'milwaukee'
+                   and job.get('overview_status') == 'Open Warranties']
 
         for job in results:
             self.available_list.insert(tk.END, job['job_ref'])
@@ -0,0 +1,26 @@
+# app_paths.py
+"""
+Where the application's files live, independent of the working directory.
+
+Bundled, read-only resources (reference images, sequences, JSON config) are
+resolved with resource_path(): PyInstaller's extraction folder when frozen,
+the project root otherwise. State written between runs (window state,
+learned locations, logs, caches and debug stores) goes in DATA_DIR via
+data_path(): the folder holding the executable when frozen, like jobs.db,
+and the project root otherwise.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.dirname(os.path.abspath(sys.executable)) if getattr(sys, "frozen", False) else BASE_DIR
+
+
+def resource_path(relative_path: str) -> str:
+    """Absolute path of a bundled resource; works for dev and for PyInstaller."""
+    return os.path.join(getattr(sys, "_MEIPASS", BASE_DIR), relative_path)
+
+
+def data_path(name: str) -> str:
+    """Absolute path of a file the application writes and reads back between runs."""
+    return os.path.join(DATA_DIR, name)
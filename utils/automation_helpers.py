@@ -6,12 +6,25 @@ import time
 import logging
 import pyautogui
 import pyperclip
-import cv2
 import numpy as np
-import pytesseract
-from PIL import Image
-# --- Master region cache ---
-_ADEN_WINDOW_REGION = None
+from collections import namedtuple
+
+from utils import screen_capture
+from utils.app_paths import data_path
+from utils.failure_snapshots import FailureSnapshotWriter
+from utils.frame_service import FrameCaptureService
+from utils.location_priors import LocationPriors
+from utils.region_stats import MatchLog
+from utils.match_cache import MatchCache
+from utils.match_executor import get_match_executor
+from utils.ocr_engine import get_ocr_engine
+from utils.ocr_profiles import read_field
+from utils.template_store import TemplateStore
+from utils.window_tracker import WindowTracker
+from utils.vision import to_gray, match_template, pyramid_match
+from utils.waiting import ChangeDetector, Backoff
+# --- Shared background capture of the ADEN window (None until started) ---
+_FRAME_SERVICE = None
 
 # --- CONFIGURATION & ASSET LOADING ---
 def resource_path(relative_path):
@@ -48,6 +61,9 @@ _SYSTEM_ASSETS = {
     "JOB_CARD_LOADED_CUE_IMG": os.path.join(IMAGE_FOLDER, "job_card_loaded_cue.png"),
     "PRINTED_CUST_NAME": os.path.join(IMAGE_FOLDER, "printed_cust_name.png"),
     "JOB_CLASS_COND": os.path.join(IMAGE_FOLDER, "job_class_cond.png"),
+    "JOB_CLASS_E": os.path.join(IMAGE_FOLDER, "job_class_e.png"),
+    "JOB_CLASS_F": os.path.join(IMAGE_FOLDER, "job_class_f.png"),
+    "JOB_CLASS_Q": os.path.join(IMAGE_FOLDER, "job_class_q.png"),
     "PRINTED_CUST_NO": os.path.join(IMAGE_FOLDER, "printed_cust_no.png"),
     "PRINTED_DATE": os.path.join(IMAGE_FOLDER, "printed_date.png"),
     "PRINTED_REF_NO": os.path.join(IMAGE_FOLDER, "printed_ref_no.png"),
@@ -63,24 +79,70 @@ IMAGE_ASSETS = {**_SYSTEM_ASSETS, **_USER_ASSETS}
 
 logger = logging.getLogger(__name__)
 DEFAULT_TIMEOUT = 10; CONFIDENCE_LEVEL = 0.8
-
-def find_aden_window(force_refind=False) -> tuple | None:
-    global _ADEN_WINDOW_REGION
-    if _ADEN_WINDOW_REGION and not force_refind:
-        return _ADEN_WINDOW_REGION
+# Waits re-match only when the region's pixels change, backing off from MIN to MAX between polls.
+MIN_POLL_INTERVAL = 0.05; POLL_INTERVAL = 0.5; CHANGE_THRESHOLD = 12
+# The window counts as settled once no more than a caret's worth of pixels changed for SETTLE_QUIET seconds.
+SETTLE_QUIET = 0.15; SETTLE_TIMEOUT = 2.0; SETTLE_MIN_PIXELS = 40
+# ADEN may take a while to start redrawing after a key or click: until the window has changed at
+# least once, it only counts as settled after this long (the fixed pause steps used to have).
+SETTLE_FIRST_CHANGE = 0.5
+ADEN_ANCHOR_CONFIDENCE = 0.85; ADEN_SEARCH_LEVELS = 2; ADEN_WINDOW_SIZE = (945, 600)
+
+# Decoded once, shared by every find_* helper below.
+TEMPLATES = TemplateStore(IMAGE_ASSETS)
+# Remembers match results for byte-identical search regions.
+MATCH_CACHE = MatchCache()
+
+# A located template: (x, y) is the centre in screen coordinates, the rest is the match box.
+Match = namedtuple("Match", "x y left top width height confidence")
+
+def _search_aden_window() -> tuple | None:
+    """Full-desktop pyramid search for the ADEN anchor. Returns its (left, top) or None."""
     try:
-        anchor_path = IMAGE_ASSETS["ADEN_WINDOW_ANCHOR_IMG"]
-        anchor_pos = pyautogui.locateOnScreen(anchor_path, confidence=0.85)
-        if anchor_pos:
-            _ADEN_WINDOW_REGION = (int(anchor_pos.left), int(anchor_pos.top), 945, 600)
-            logger.info(f"ADEN window found at: {_ADEN_WINDOW_REGION}")
-            return _ADEN_WINDOW_REGION
+        anchor = TEMPLATES.get("ADEN_WINDOW_ANCHOR_IMG")
+        desktop = screen_capture.desktop_bounds()
+        started = time.perf_counter()
+        haystack = screen_capture.grab_gray(desktop)
+        capture_time = time.perf_counter() - started
+
+        score, (x, y), timings = pyramid_match(haystack, anchor, levels=ADEN_SEARCH_LEVELS)
+        timing_report = ", ".join(f"L{level}: {secs * 1000:.1f}ms/{n} cand." for level, secs, n in timings)
+        logger.debug(f"ADEN anchor search: capture {capture_time * 1000:.1f}ms, {timing_report}")
+
+        if score < ADEN_ANCHOR_CONFIDENCE:
+            # The coarse pass can miss on unusual scaling; fall back to a full-resolution search.
+            started = time.perf_counter()
+            score, (x, y) = match_template(haystack, anchor)
+            logger.debug(f"ADEN anchor full-resolution fallback: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        if score >= ADEN_ANCHOR_CONFIDENCE:
+            return desktop[0] + x, desktop[1] + y
     except Exception as e:
         logger.error(f"Error finding ADEN window anchor: {e}")
-    _ADEN_WINDOW_REGION = None
     logger.error("Could not find the ADEN window on screen.")
     return None
 
+# --- Master region cache: verified against the anchor before use, persisted between runs ---
+WINDOW_STATE_PATH = data_path("aden_window_state.json")
+WINDOW_TRACKER = WindowTracker(
+    anchor_provider=lambda: TEMPLATES.get("ADEN_WINDOW_ANCHOR_IMG"),
+    capture_gray=screen_capture.grab_gray,
+    finder=_search_aden_window,
+    state_path=WINDOW_STATE_PATH,
+    window_size=ADEN_WINDOW_SIZE,
+    confidence=ADEN_ANCHOR_CONFIDENCE,
+)
+
+def find_aden_window(force_refind=False) -> tuple | None:
+    return WINDOW_TRACKER.get(force_refind=force_refind)
+
+# --- Learned window-relative target positions, searched before the full calibrated region ---
+LOCATION_PRIORS_PATH = data_path("location_priors.json")
+LOCATION_PRIORS = LocationPriors(LOCATION_PRIORS_PATH)
+# --- Every successful match box, read offline by utils/region_optimizer.py ---
+MATCH_LOG_PATH = data_path("match_log.jsonl")
+MATCH_LOG = MatchLog(MATCH_LOG_PATH)
+
 def get_region(key: str) -> tuple:
     aden_window = find_aden_window()
     if not aden_window:
@@ -92,18 +154,161 @@ def get_region(key: str) -> tuple:
     absolute_top = aden_window[1] + relative_region_data["top"]
     return absolute_left, absolute_top, relative_region_data["width"], relative_region_data["height"]
 
+# --- Failure screenshots: captured on the spot, encoded and written in the background ---
+DEBUG_IMAGES_DIR = data_path("debug_images")
+FAILURE_SNAPSHOTS = FailureSnapshotWriter(DEBUG_IMAGES_DIR)
+
 def _save_failure_screenshot(key: str):
-    """Helper to save a debug screenshot."""
+    """Queues a debug screenshot of the ADEN window (the whole desktop if the window is gone)."""
     try:
-        failure_timestamp = time.strftime("%Y%m%d-%H%M%S")
-
-        screenshot_path = os.path.join(os.path.dirname(__file__), "..", "debug_images",
-                                           f"debug_failure_{key}_{failure_timestamp}.png")
-        pyautogui.screenshot(screenshot_path)
-        logger.error(f"Debug screenshot saved to: {screenshot_path}")
+        region = WINDOW_TRACKER.cached_region or screen_capture.desktop_bounds()
+        FAILURE_SNAPSHOTS.submit(key, capture_region(region))
     except Exception as e:
         logger.error(f"Failed to save debug screenshot: {e}")
 
+# --- SHARED FRAME CAPTURE ---
+def start_frame_service(fps: float = 10, ring_size: int = 4) -> FrameCaptureService:
+    """
+    Starts (or retunes) the background capture of the ADEN window. While it runs,
+    every capture that falls inside the window is served from its shared frame.
+    """
+    global _FRAME_SERVICE
+    if _FRAME_SERVICE is None:
+        _FRAME_SERVICE = FrameCaptureService(lambda: WINDOW_TRACKER.cached_region, fps=fps, ring_size=ring_size)
+    _FRAME_SERVICE.fps = fps
+    _FRAME_SERVICE.start()
+    return _FRAME_SERVICE
+
+def stop_frame_service():
+    if _FRAME_SERVICE is not None:
+        _FRAME_SERVICE.stop()
+
+def capture_region(region: tuple, gray: bool = False, newer_than: float = None) -> np.ndarray:
+    """
+    Returns the pixels of `region` as a numpy array (RGB, or grayscale if `gray`).
+    Served zero-copy from the shared frame when the capture service covers the
+    region and has a frame taken at/after `newer_than`; otherwise grabbed directly.
+    """
+    if _FRAME_SERVICE is not None and _FRAME_SERVICE.is_running:
+        view = _FRAME_SERVICE.crop(region, gray=gray, newer_than=newer_than)
+        if view is not None:
+            return view
+    return screen_capture.grab_gray(region) if gray else screen_capture.grab(region)
+
+# --- LOCATOR ENGINE ---
+def _grab_screen(region: tuple, newer_than: float = None) -> np.ndarray:
+    """Captures a screen region as an RGB numpy array."""
+    return capture_region(region, newer_than=newer_than)
+
+def _grab_screen_gray(region: tuple, newer_than: float = None) -> np.ndarray:
+    """Captures a screen region as a grayscale numpy array."""
+    return capture_region(region, gray=True, newer_than=newer_than)
+
+def locate_in_image(key: str, haystack_gray: np.ndarray, origin: tuple = (0, 0),
+                    confidence: float = CONFIDENCE_LEVEL, parallel: bool = False) -> Match | None:
+    """
+    Matches the cached template for `key` against an already captured grayscale image.
+    `origin` is the screen position of the image's top-left pixel. With `parallel`,
+    large haystacks are split into bands matched on the shared match pool.
+    """
+    template = TEMPLATES.get(key)
+    cache_key = MATCH_CACHE.key_for(key, TEMPLATES.version(key), haystack_gray)
+    cached = MATCH_CACHE.get(cache_key)
+    if cached is not None:
+        score, (x, y) = cached
+    else:
+        if parallel:
+            score, (x, y) = get_match_executor().match_tiled(haystack_gray, template)
+        else:
+            score, (x, y) = match_template(haystack_gray, template)
+        MATCH_CACHE.put(cache_key, (score, (x, y)))
+    if score < confidence:
+        return None
+    h, w = template.shape
+    left, top = origin[0] + x, origin[1] + y
+    return Match(left + w // 2, top + h // 2, left, top, w, h, score)
+
+def locate(key: str, region: tuple = None, confidence: float = CONFIDENCE_LEVEL,
+           newer_than: float = None) -> Match | None:
+    """
+    Captures `region` (defaults to the key's calibrated region) once and looks for `key` in it.
+    `newer_than` rejects shared frames captured before that time (e.g. before the last click).
+    """
+    if region is None:
+        region = get_region(key)
+    haystack = _grab_screen_gray(region, newer_than=newer_than)
+    return locate_in_image(key, haystack, origin=region[:2], confidence=confidence)
+
+def _record_match(key: str, match: Match, window: tuple, prior_hit: bool = None):
+    """Feeds a successful match into the location priors and the match log (window-relative)."""
+    rel_left, rel_top = match.left - window[0], match.top - window[1]
+    LOCATION_PRIORS.record(key, rel_left, rel_top, match.width, match.height, prior_hit=prior_hit)
+    MATCH_LOG.record(key, rel_left, rel_top, match.width, match.height, match.confidence)
+
+def _locate_with_prior(key: str, haystack_gray: np.ndarray, search_region: tuple,
+                       parallel: bool = False) -> Match | None:
+    """
+    Looks for `key` in the learned ROI (a slice of `haystack_gray`) first and falls back
+    to the whole search region on a miss. Successful positions are fed back into the priors
+    and the match log.
+    """
+    window = WINDOW_TRACKER.cached_region
+    if window is None:
+        return locate_in_image(key, haystack_gray, origin=search_region[:2], parallel=parallel)
+
+    tried_prior = False
+    prior = LOCATION_PRIORS.predict(key)
+    if prior:
+        # Window-relative prior -> clipped slice of the already captured search region.
+        x0 = max(0, window[0] + prior[0] - search_region[0])
+        y0 = max(0, window[1] + prior[1] - search_region[1])
+        x1 = min(haystack_gray.shape[1], window[0] + prior[0] + prior[2] - search_region[0])
+        y1 = min(haystack_gray.shape[0], window[1] + prior[1] + prior[3] - search_region[1])
+        th, tw = TEMPLATES.get(key).shape
+        if x1 - x0 >= tw and y1 - y0 >= th:
+            tried_prior = True
+            match = locate_in_image(key, haystack_gray[y0:y1, x0:x1],
+                                    origin=(search_region[0] + x0, search_region[1] + y0))
+            if match:
+                _record_match(key, match, window, prior_hit=True)
+                return match
+
+    match = locate_in_image(key, haystack_gray, origin=search_region[:2], parallel=parallel)
+    if match:
+        # A full-region hit after a prior miss means the target moved (or the prior is stale).
+        _record_match(key, match, window, prior_hit=False if tried_prior else None)
+    return match
+
+def _sleep_before_next_poll(backoff: Backoff, end_time: float):
+    time.sleep(max(0.0, min(backoff.next(), end_time - time.time())))
+
+def _poll_for_match(key: str, timeout: float, task_name: str, region: tuple = None,
+                    parallel: bool = False) -> Match | None:
+    """
+    Shared change-driven wait for the find_* helpers. Each poll captures the search
+    region, but the template match only re-runs when the pixels differ from the
+    previous poll; while the screen is static the poll delay backs off.
+    Returns the match, or None on timeout/error.
+    """
+    if key not in IMAGE_ASSETS: raise KeyError(f"No image asset for key '{key}'")
+    changes = ChangeDetector(CHANGE_THRESHOLD)
+    backoff = Backoff(MIN_POLL_INTERVAL, POLL_INTERVAL)
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        try:
+            search_region = region or get_region(key)
+            haystack = _grab_screen_gray(search_region, newer_than=time.time())
+            if changes.changed(haystack, key=search_region):
+                backoff.reset()
+                match = _locate_with_prior(key, haystack, search_region, parallel=parallel)
+                if match:
+                    return match
+        except Exception as e:
+            logger.error(f"Error in {task_name} for '{key}': {e}", exc_info=True)
+            break
+        _sleep_before_next_poll(backoff, end_time)
+    return None
+
 # --- HELPER FUNCTIONS ---
 def find_image_and_get_text(key: str, timeout: int = DEFAULT_TIMEOUT) -> str | None:
     """
@@ -118,50 +323,40 @@ def find_image_and_get_text(key: str, timeout: int = DEFAULT_TIMEOUT) -> str | N
         str | None: The extracted text if the image is found, otherwise None.
     """
     logger.info(f"--- Task: Finding '{key}' to read text ---")
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path:
+    if key not in IMAGE_ASSETS:
         raise KeyError(f"No image asset for key '{key}'")
 
+    changes = ChangeDetector(CHANGE_THRESHOLD)
+    backoff = Backoff(MIN_POLL_INTERVAL, POLL_INTERVAL)
     end_time = time.time() + timeout
     while time.time() < end_time:
         try:
             search_region = get_region(key)
 
-            # 1. Take a screenshot of the broader search region
-            screenshot_pil = pyautogui.screenshot(region=search_region)
-            screenshot_cv = cv2.cvtColor(np.array(screenshot_pil), cv2.COLOR_RGB2GRAY)
+            # 1. Take a single screenshot of the broader search region
+            screenshot = _grab_screen(search_region, newer_than=time.time())
+            screenshot_gray = to_gray(screenshot)
 
-            # 2. Load the reference image (template) to find
-            template_cv = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-            if template_cv is None:
-                logger.error(f"Could not load reference image for key '{key}' at path: {image_path}")
-                return None
+            # 2. Match the cached template against it, unless nothing changed since the last poll
+            template_cv = TEMPLATES.get(key)
+            match = None
+            if changes.changed(screenshot_gray, key=search_region):
+                backoff.reset()
+                match = _locate_with_prior(key, screenshot_gray, search_region)
 
-            # 3. Perform template matching
-            result = cv2.matchTemplate(screenshot_cv, template_cv, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            # 3. If a match is found, define the OCR area and extract text
+            if match:
+                max_loc = (match.left - search_region[0], match.top - search_region[1])
+                logger.info(f"✅ Found '{key}' with confidence {match.confidence:.2f} at {max_loc} within the region.")
 
-            # 4. If a match is found, define the OCR area and extract text
-            if max_val >= CONFIDENCE_LEVEL:
-                logger.info(f"✅ Found '{key}' with confidence {max_val:.2f} at {max_loc} within the region.")
-
-                # Define the OCR region relative to the found image
-                # This crops the original screenshot (in PIL format)
                 # It starts from the right edge of the found image to the right edge of the search area
-                match_width = template_cv.shape[1]
-                ocr_left = max_loc[0] + match_width
+                ocr_left = max_loc[0] + template_cv.shape[1]
                 ocr_top = max_loc[1]
-                ocr_right = screenshot_pil.width  # Extends to the end of the search region
                 ocr_bottom = max_loc[1] + template_cv.shape[0]
+                ocr_image = screenshot[ocr_top:ocr_bottom, ocr_left:]
 
-                # Crop the screenshot to get the OCR area
-                ocr_image = screenshot_pil.crop((ocr_left, ocr_top, ocr_right, ocr_bottom))
-
-                # For debugging, you can save the cropped image
-                # ocr_image.save(f"debug_ocr_crop_{key}.png")
-
-                # 5. Extract text using Tesseract
-                text = pytesseract.image_to_string(ocr_image, config='--psm 7').strip()
+                # 4. Extract text using Tesseract (the profile trims the crop to the text extent)
+                text = read_field(ocr_image, "label_value").text.strip()
                 logger.info(f"✅ Extracted Text: '{text}'")
                 return text
 
@@ -169,7 +364,7 @@ def find_image_and_get_text(key: str, timeout: int = DEFAULT_TIMEOUT) -> str | N
             logger.error(f"An error occurred in find_image_and_get_text for '{key}': {e}", exc_info=True)
             break  # Exit loop on unexpected error
 
-        time.sleep(0.5)
+        _sleep_before_next_poll(backoff, end_time)
 
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{key}'.")
     _save_failure_screenshot(key)
@@ -195,123 +390,97 @@ def paste_from_clipboard() -> bool:
         return False
 
 
+
 def find_and_click(key: str, timeout: int = DEFAULT_TIMEOUT, clicks: int = 1) -> bool:
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path: raise KeyError(f"No image asset for key '{key}'")
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            region = get_region(key) 
-            loc = pyautogui.locateCenterOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True)
-            if loc:
-                logger.info(f"✅ Found '{key}' at {loc}. Clicking.")
-                pyautogui.click(loc, clicks=clicks)
-                return True
-        except pyautogui.ImageNotFoundException: pass
-        except Exception as e: logger.error(f"Error in find_and_click for '{key}': {e}", exc_info=True); break
-        time.sleep(0.5)
+    loc = _poll_for_match(key, timeout, "find_and_click")
+    if loc:
+        logger.info(f"✅ Found '{key}' at {(loc.x, loc.y)}. Clicking.")
+        pyautogui.click(loc.x, loc.y, clicks=clicks)
+        return True
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{key}'.")
     _save_failure_screenshot(key)
     return False
 
 def find_label_and_click_offset(key: str, x_offset: int = 0, y_offset: int = 0, timeout: int = DEFAULT_TIMEOUT) -> bool:
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path: raise KeyError(f"No image asset for key '{key}'")
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            region = get_region(key)
-            loc = pyautogui.locateCenterOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True)
-            if loc:
-                click_point = (loc.x + x_offset, loc.y + y_offset)
-                logger.info(f"✅ Found '{key}' at {loc}. Clicking offset target at {click_point}.")
-                pyautogui.click(click_point)
-                return True
-        except pyautogui.ImageNotFoundException: pass
-        except Exception as e: logger.error(f"Error in find_label_and_click_offset for '{key}': {e}", exc_info=True); break
-        time.sleep(0.5)
+    loc = _poll_for_match(key, timeout, "find_label_and_click_offset")
+    if loc:
+        click_point = (loc.x + x_offset, loc.y + y_offset)
+        logger.info(f"✅ Found '{key}' at {(loc.x, loc.y)}. Clicking offset target at {click_point}.")
+        pyautogui.click(click_point)
+        return True
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{key}'")
     _save_failure_screenshot(key)
     return False
 
 def find_and_right_click(key: str, timeout: int = DEFAULT_TIMEOUT) -> bool:
     logger.info(f"--- Task: Right-clicking {key} ---")
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path: raise KeyError(f"No image asset for key '{key}'")
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            region = get_region(key)
-            loc = pyautogui.locateCenterOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True)
-            if loc:
-                pyautogui.rightClick(loc)
-                logger.info(f"✅ Right-clicked '{key}' at {loc}.")
-                return True
-        except pyautogui.ImageNotFoundException: pass
-        except Exception as e: logger.error(f"Error in find_and_right_click for '{key}': {e}", exc_info=True); break
-        time.sleep(0.5)
+    loc = _poll_for_match(key, timeout, "find_and_right_click")
+    if loc:
+        pyautogui.rightClick(loc.x, loc.y)
+        logger.info(f"✅ Right-clicked '{key}' at {(loc.x, loc.y)}.")
+        return True
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{key}'.")
     _save_failure_screenshot(key)
     return False
 
 def find_and_double_click_offset(key: str, x_offset: int, y_offset: int, timeout: int = DEFAULT_TIMEOUT) -> bool:
     logger.info(f"--- Task: Double-clicking offset from {key} ---")
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path: raise KeyError(f"No image asset for key '{key}'")
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            region = get_region(key)
-            loc = pyautogui.locateCenterOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True)
-            if loc:
-                click_point = (loc.x + x_offset, loc.y + y_offset)
-                pyautogui.doubleClick(click_point)
-                logger.info(f"✅ Double-clicked offset from '{key}' at {click_point}.")
-                return True
-        except pyautogui.ImageNotFoundException: pass
-        except Exception as e: logger.error(f"Error in find_and_double_click_offset for '{key}': {e}", exc_info=True); break
-        time.sleep(0.5)
+    loc = _poll_for_match(key, timeout, "find_and_double_click_offset")
+    if loc:
+        click_point = (loc.x + x_offset, loc.y + y_offset)
+        pyautogui.doubleClick(click_point)
+        logger.info(f"✅ Double-clicked offset from '{key}' at {click_point}.")
+        return True
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{key}'.")
     _save_failure_screenshot(key)
     return False
 
 def find_and_move_to(key: str, timeout: int = DEFAULT_TIMEOUT) -> bool:
     logger.info(f"--- Task: Moving mouse to {key} ---")
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path: raise KeyError(f"No image asset for key '{key}'")
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            region = get_region(key)
-            loc = pyautogui.locateCenterOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True)
-            if loc:
-                pyautogui.moveTo(loc)
-                logger.info(f"✅ Moved mouse to '{key}' at {loc}.")
-                return True
-        except pyautogui.ImageNotFoundException: pass
-        except Exception as e: logger.error(f"Error in find_and_move_to for '{key}': {e}", exc_info=True); break
-        time.sleep(0.5)
+    loc = _poll_for_match(key, timeout, "find_and_move_to")
+    if loc:
+        pyautogui.moveTo(loc.x, loc.y)
+        logger.info(f"✅ Moved mouse to '{key}' at {(loc.x, loc.y)}.")
+        return True
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{key}'.")
     _save_failure_screenshot(key)
     return False
 
 def wait_for_image(key: str, timeout: int = 10) -> bool:
     logger.info(f"--- Task: Waiting for {key} to appear ---")
-    image_path = IMAGE_ASSETS.get(key)
-    if not image_path: raise KeyError(f"No image asset for key '{key}'")
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        try:
-            region = get_region(key)
-            if pyautogui.locateOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True):
-                logger.info(f"✅ Found '{key}'.")
-                return True
-        except pyautogui.ImageNotFoundException: pass
-        except Exception as e: logger.error(f"Error in wait_for_image for '{key}': {e}", exc_info=True); break
-        time.sleep(0.5)
+    if _poll_for_match(key, timeout, "wait_for_image"):
+        logger.info(f"✅ Found '{key}'.")
+        return True
     logger.error(f"❌ Timed out after {timeout}s waiting for '{key}'.")
     return False
 
+
+def wait_for_settle(quiet: float = SETTLE_QUIET, timeout: float = SETTLE_TIMEOUT,
+                    first_change: float = SETTLE_FIRST_CHANGE) -> bool:
+    """
+    Waits until the ADEN window has stopped changing (a blinking caret aside) for `quiet`
+    seconds. A window that hasn't changed at all yet is given `first_change` seconds to
+    start redrawing first. Returns False if it was still changing after `timeout` seconds.
+    """
+    window = find_aden_window()
+    if not window:
+        return False
+    changes = ChangeDetector(CHANGE_THRESHOLD, min_pixels=SETTLE_MIN_PIXELS)
+    changes.changed(_grab_screen_gray(window, newer_than=time.time()))  # Reference frame
+    started = last_change = time.time()
+    end_time = started + timeout
+    redrawn = False
+    while time.time() < end_time:
+        if changes.changed(_grab_screen_gray(window, newer_than=time.time())):
+            last_change = time.time()
+            redrawn = True
+        elif time.time() - last_change >= quiet and (redrawn or time.time() - started >= first_change):
+            return True
+        time.sleep(MIN_POLL_INTERVAL)
+    logger.debug(f"ADEN window still changing after {timeout}s.")
+    return False
+
+
 def find_image_in_region(image_key: str, region_key: str, action: str = "click", timeout: int = DEFAULT_TIMEOUT) -> bool:
     """
     Finds an image within a specified region and performs the specified action.
@@ -329,8 +498,7 @@ def find_image_in_region(image_key: str, region_key: str, action: str = "click",
         If action is "get_text", returns the extracted text if found, None otherwise.
     """
     logger.info(f"--- Task: Finding '{image_key}' in region '{region_key}' and performing '{action}' ---")
-    image_path = IMAGE_ASSETS.get(image_key)
-    if not image_path: 
+    if image_key not in IMAGE_ASSETS: 
         raise KeyError(f"No image asset for key '{image_key}'")
 
     # Get the ADEN window region for drawing the region box and for the search
@@ -339,61 +507,51 @@ def find_image_in_region(image_key: str, region_key: str, action: str = "click",
         logger.error("Cannot find image in region because the main ADEN window was not found.")
         return False
 
-    end_time = time.time() + timeout
-    while time.time() < end_time:
+    # Use the ADEN window region for the search
+    region = aden_window
+    match = _poll_for_match(image_key, timeout, "find_image_in_region", region=region, parallel=True)
+
+    if match:
+        loc = (match.x, match.y)
+        logger.info(f"✅ Found '{image_key}' at {loc} in region '{region_key}'.")
         try:
-            # Use the ADEN window region for the search
-            region = aden_window
-            loc = pyautogui.locateCenterOnScreen(image_path, confidence=CONFIDENCE_LEVEL, region=region, grayscale=True)
-
-            if loc:
-                logger.info(f"✅ Found '{image_key}' at {loc} in region '{region_key}'.")
-
-                if action == "click" or action == "click_center":
-                    pyautogui.click(loc)
-                    logger.info(f"Clicked on '{image_key}'.")
-                    return True
-                elif action == "double_click" or action == "double_click_center":
-                    pyautogui.doubleClick(loc)
-                    logger.info(f"Double-clicked on '{image_key}'.")
-                    return True
-                elif action == "right_click" or action == "right_click_center":
-                    pyautogui.rightClick(loc)
-                    logger.info(f"Right-clicked on '{image_key}'.")
-                    return True
-                elif action == "move_to" or action == "move_to_target":
-                    pyautogui.moveTo(loc)
-                    logger.info(f"Moved to '{image_key}'.")
-                    return True
-                elif action == "get_text":
-                    # Take a screenshot of the region
-                    # For get_text action, we still want to use the selected target region
-                    # to get more accurate OCR results
-                    try:
-                        target_region = get_region(region_key)
-                        screenshot = pyautogui.screenshot(region=target_region)
-                    except Exception:
-                        # Fallback to ADEN window region if target region is not available
-                        screenshot = pyautogui.screenshot(region=region)
-
-                    # Convert to grayscale for OCR
-                    screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
-
-                    # Extract text using Tesseract
-                    text = pytesseract.image_to_string(screenshot_cv).strip()
-                    logger.info(f"Extracted text from region: '{text}'")
-                    return text
-                else:
-                    logger.warning(f"Unknown action '{action}'. No action performed.")
-                    return True  # Return True because the image was found
-
-        except pyautogui.ImageNotFoundException: 
-            pass
-        except Exception as e: 
+            if action == "click" or action == "click_center":
+                pyautogui.click(loc)
+                logger.info(f"Clicked on '{image_key}'.")
+                return True
+            elif action == "double_click" or action == "double_click_center":
+                pyautogui.doubleClick(loc)
+                logger.info(f"Double-clicked on '{image_key}'.")
+                return True
+            elif action == "right_click" or action == "right_click_center":
+                pyautogui.rightClick(loc)
+                logger.info(f"Right-clicked on '{image_key}'.")
+                return True
+            elif action == "move_to" or action == "move_to_target":
+                pyautogui.moveTo(loc)
+                logger.info(f"Moved to '{image_key}'.")
+                return True
+            elif action == "get_text":
+                # Take a screenshot of the region
+                # For get_text action, we still want to use the selected target region
+                # to get more accurate OCR results
+                try:
+                    target_region = get_region(region_key)
+                    screenshot_cv = _grab_screen_gray(target_region)
+                except Exception:
+                    # Fallback to ADEN window region if target region is not available
+                    screenshot_cv = _grab_screen_gray(region)
+
+                # Extract text using Tesseract
+                text = get_ocr_engine().image_to_string(screenshot_cv).strip()
+                logger.info(f"Extracted text from region: '{text}'")
+                return text
+            else:
+                logger.warning(f"Unknown action '{action}'. No action performed.")
+                return True  # Return True because the image was found
+        except Exception as e:
             logger.error(f"Error in find_image_in_region for '{image_key}' in '{region_key}': {e}", exc_info=True)
-            break
-
-        time.sleep(0.5)
+            return False
 
     logger.error(f"❌ Timed out after {timeout}s. Could not find '{image_key}' in region '{region_key}'.")
     _save_failure_screenshot(image_key)
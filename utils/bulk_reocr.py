@@ -0,0 +1,158 @@
+# bulk_reocr.py
+"""
+Offline bulk re-OCR of stored debug captures.
+
+After changing an OCR profile (or spotting a misread pattern) the stored
+captures in the debug capture store can be recognised again locally instead
+of re-running a re-scrape sequence against ADEN. Captures are OCR'd in a
+process pool across all cores, compared with what the jobs database holds,
+and optionally written back.
+
+Only captures that were stored can be re-read: with the default
+DEBUG_CAPTURE_MODE ("failure") that is just the failed fields and jobs. Set
+it to "all" in app_controller.py for the batches that should be re-readable
+as a whole (captures are kept for DEBUG_CAPTURE_RETENTION_DAYS).
+
+Descriptions are not re-read unless asked for. Stored descriptions keep the
+blank lines of the original read, so they are compared line by line with
+blank lines and surrounding whitespace ignored.
+
+Usage:
+    python -m utils.bulk_reocr                          # diff every single-line field
+    python -m utils.bulk_reocr --fields customer_no --profile customer_no --apply
+    python -m utils.bulk_reocr --fields descriptions    # multi-line descriptions too
+"""
+import sys
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from core import db
+from core.db import DB_NAME
+from services.job_class import JOB_CLASS_MAP
+from utils.app_paths import data_path
+from utils.ocr_profiles import read_field
+
+DEFAULT_CAPTURES_PATH = data_path("debug_captures.db")
+# Captured data context field -> jobs table column.
+FIELD_COLUMNS = {
+    "customer_no": "customer_no",
+    "customer_name": "customer_name",
+    "date": "job_date",
+    "Job_Class_Cond": "job_class_cond",
+    "descriptions": "description",
+}
+DEFAULT_FIELDS = [field for field in FIELD_COLUMNS if field != "descriptions"]
+
+
+def load_captures(captures_db: str, fields, job_refs=None) -> dict:
+    """
+    Returns {(job_ref, field): [png, ...]}: the latest capture per field, or every capture in
+    order for descriptions (which are read in several chunks).
+    """
+    query = ("SELECT job_ref, field, png FROM debug_captures WHERE field IN (%s) ORDER BY ts"
+             % ",".join("?" * len(fields)))
+    captures = {}
+    with sqlite3.connect(captures_db) as conn:
+        for job_ref, field, png in conn.execute(query, list(fields)):
+            if job_refs and job_ref not in job_refs:
+                continue
+            if field == "descriptions":
+                captures.setdefault((job_ref, field), []).append(png)
+            else:
+                captures[(job_ref, field)] = [png]
+    return captures
+
+
+def _reocr(task: tuple) -> tuple:
+    """Process pool worker: OCRs the PNG captures of one (job_ref, field) under `profile`."""
+    job_ref, field, profile, pngs = task
+    texts = []
+    for png in pngs:
+        image = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            texts.append(read_field(image, profile).text)
+    return job_ref, field, texts
+
+
+def db_value(field: str, texts: list[str]) -> str:
+    """Normalises OCR output the way a sequence stores it for `field`."""
+    if field == "descriptions":
+        return "\n".join(line for text in texts for line in text.splitlines())
+    text = texts[-1].strip() if texts else ""
+    if field == "Job_Class_Cond":
+        return JOB_CLASS_MAP.get(text.upper(), text)
+    return text
+
+
+def reocr_captures(captures: dict, profile: str = None, workers: int = None):
+    """OCRs every capture set on a process pool; yields (job_ref, field, new_value) in input order."""
+    tasks = [(job_ref, field, profile or field, pngs) for (job_ref, field), pngs in captures.items()]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job_ref, field, texts in pool.map(_reocr, tasks, chunksize=8):
+            yield job_ref, field, db_value(field, texts)
+
+
+def _lines(text: str) -> list[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def values_differ(field: str, old_value: str, new_value: str) -> bool:
+    """True if a re-read changes a stored value; descriptions are compared as their non-blank lines."""
+    if field == "descriptions":
+        return _lines(new_value) != _lines(old_value)
+    return new_value != old_value
+
+
+def diff_against_db(results, jobs_db: str) -> list[tuple]:
+    """Returns [(job_ref, field, old_value, new_value)] where the re-OCR disagrees with the database."""
+    diffs = []
+    with sqlite3.connect(jobs_db) as conn:
+        for job_ref, field, new_value in results:
+            row = conn.execute(f"SELECT {FIELD_COLUMNS[field]} FROM jobs WHERE job_ref = ?", (job_ref,)).fetchone()
+            if row is None:
+                continue
+            old_value = (row[0] or "").strip()
+            if new_value and values_differ(field, old_value, new_value):
+                diffs.append((job_ref, field, old_value, new_value))
+    return diffs
+
+
+def apply_diffs(diffs: list[tuple], jobs_db: str):
+    """Writes the corrected values in one transaction and logs an event per corrected job."""
+    with sqlite3.connect(jobs_db) as conn:
+        for job_ref, field, _, new_value in diffs:
+            conn.execute(f"UPDATE jobs SET {FIELD_COLUMNS[field]} = ? WHERE job_ref = ?", (new_value, job_ref))
+    for job_ref in sorted({d[0] for d in diffs}):
+        fields = ", ".join(d[1] for d in diffs if d[0] == job_ref)
+        db.add_job_event(job_ref, "OCR Correction", f"Re-OCR of stored captures corrected: {fields}.")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Re-OCR stored debug captures and diff them against the jobs DB.")
+    parser.add_argument("--captures", default=DEFAULT_CAPTURES_PATH, help="Debug capture store.")
+    parser.add_argument("--jobs", default=DB_NAME, help="Jobs database.")
+    parser.add_argument("--fields", nargs="+", default=DEFAULT_FIELDS, choices=list(FIELD_COLUMNS))
+    parser.add_argument("--profile", help="OCR profile to use for every field (default: each field's own).")
+    parser.add_argument("--job-refs", nargs="+", help="Only these jobs.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores).")
+    parser.add_argument("--apply", action="store_true", help="Write the corrected values to the database.")
+    args = parser.parse_args(argv)
+
+    captures = load_captures(args.captures, args.fields, set(args.job_refs or []))
+    print(f"Re-OCR of {len(captures)} stored captures...")
+    diffs = diff_against_db(reocr_captures(captures, args.profile, args.workers), args.jobs)
+    for job_ref, field, old_value, new_value in diffs:
+        print(f"{job_ref:<12} {field:<16} {old_value!r} -> {new_value!r}")
+    print(f"{len(diffs)} differences.")
+    if args.apply and diffs:
+        apply_diffs(diffs, args.jobs)
+        print(f"Applied {len(diffs)} corrections.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
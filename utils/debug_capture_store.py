@@ -0,0 +1,156 @@
+# debug_capture_store.py
+"""
+Debug store for OCR captures.
+
+Instead of writing a PNG per field per job on the automation thread, raw
+capture arrays are handed to a background encoder that stores them as PNG
+blobs in one SQLite table indexed by (job_ref, field, ts). Cleanup is a
+single DELETE by age instead of a directory walk.
+
+Modes:
+    "off"      -- nothing is kept.
+    "sampled"  -- a fraction (`sample_rate`) of all captures, plus every failed one.
+    "failure"  -- only captures of fields that failed, or of jobs that failed validation.
+    "all"      -- every capture (what utils/bulk_reocr.py needs to re-read a whole batch).
+"""
+import time
+import queue
+import random
+import sqlite3
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MODES = ("off", "sampled", "failure", "all")
+
+
+class DebugCaptureStore:
+    """Background, mode-filtered writer of OCR captures into a SQLite blob table."""
+
+    def __init__(self, db_path: str, mode: str = "failure", sample_rate: float = 0.1,
+                 queue_size: int = 64, max_pending_jobs: int = 8):
+        """
+        Args:
+            db_path (str): SQLite file the captures are stored in.
+            mode (str): One of CAPTURE_MODES.
+            sample_rate (float): Fraction of successful captures kept in "sampled" mode.
+            queue_size (int): Captures waiting to be encoded; more are dropped.
+            max_pending_jobs (int): Jobs whose captures are held in memory until their outcome is known.
+        """
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown debug capture mode '{mode}'; expected one of {CAPTURE_MODES}")
+        self.db_path = db_path
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.max_pending_jobs = max_pending_jobs
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}  # job_ref -> [(field, ts, status, array)], held in "failure" mode
+        self._lock = threading.Lock()
+        self._thread = None
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS debug_captures (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_ref TEXT,
+                    field TEXT,
+                    ts REAL,
+                    status TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    png BLOB
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_debug_captures_job ON debug_captures (job_ref, field, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_debug_captures_ts ON debug_captures (ts)")
+
+    def submit(self, job_ref: str, field: str, image: np.ndarray, status: str = "ok"):
+        """
+        Offers one capture to the store. Returns immediately; encoding and the insert happen
+        on the background thread. `status` is "ok" or a short failure reason (e.g. "empty").
+        """
+        if self.mode == "off":
+            return
+        entry = (field, time.time(), status, np.array(image, copy=True))
+        if status != "ok" or self.mode == "all" or (self.mode == "sampled" and random.random() < self.sample_rate):
+            self._enqueue(job_ref, entry)
+        elif self.mode == "failure":
+            # Kept until finish_job() says whether the job as a whole failed.
+            with self._lock:
+                self._pending.setdefault(job_ref, []).append(entry)
+                while len(self._pending) > self.max_pending_jobs:
+                    self._pending.pop(next(iter(self._pending)))
+
+    def finish_job(self, job_ref: str, success: bool):
+        """Stores the held captures of a failed job; discards them if it succeeded."""
+        with self._lock:
+            entries = self._pending.pop(job_ref, [])
+        if not success:
+            for field, ts, status, image in entries:
+                self._enqueue(job_ref, (field, ts, "job_failed" if status == "ok" else status, image))
+
+    def _enqueue(self, job_ref: str, entry: tuple):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="debug-captures", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((job_ref,) + entry)
+        except queue.Full:
+            logger.debug(f"Debug capture queue full; dropped '{entry[0]}' for {job_ref}.")
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            job_ref, field, ts, status, image = self._queue.get()
+            try:
+                if image.ndim == 3:
+                    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+                ok, encoded = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                if ok:
+                    conn.execute(
+                        "INSERT INTO debug_captures (job_ref, field, ts, status, width, height, png) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job_ref, field, ts, status, image.shape[1], image.shape[0], encoded.tobytes()))
+                    conn.commit()
+            except Exception as e:
+                logger.error(f"Failed to store debug capture '{field}' for {job_ref}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Waits (up to `timeout`) for queued captures to be stored."""
+        end_time = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < end_time:
+            time.sleep(0.05)
+
+    def prune(self, max_age_days: float = 0) -> int:
+        """Deletes captures older than `max_age_days` (all of them for 0). Returns the number removed."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM debug_captures WHERE ts < ?", (cutoff,)).rowcount
+
+    def fetch(self, job_ref: str, field: str = None) -> list:
+        """Returns [(field, ts, status, image), ...] for a job, newest first, decoded back to arrays."""
+        query = "SELECT field, ts, status, png FROM debug_captures WHERE job_ref = ?"
+        args = [job_ref]
+        if field:
+            query += " AND field = ?"
+            args.append(field)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY ts DESC", args).fetchall()
+        captures = []
+        for row_field, ts, status, png in rows:
+            image = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_UNCHANGED)
+            if image is not None and image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            captures.append((row_field, ts, status, image))
+        return captures
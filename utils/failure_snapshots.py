@@ -0,0 +1,141 @@
+# failure_snapshots.py
+"""
+Background writer for failure screenshots.
+
+A failed step only needs the pixels it failed on, so the capture (the ADEN
+window, a few milliseconds) happens on the calling thread and everything
+else -- PNG encoding, disk I/O, retention -- happens on a worker thread.
+Identical failures (same key, same pixels) and bursts of failures for the
+same key are dropped, and the directory is kept to a bounded ring of the
+newest files by count and by total size.
+"""
+import os
+import time
+import queue
+import hashlib
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PREFIX = "debug_failure_"
+
+
+class FailureSnapshotWriter:
+    """Queues failure captures and writes them asynchronously into a bounded on-disk ring."""
+
+    def __init__(self, directory: str, max_files: int = 50, max_bytes: int = 50 * 1024 * 1024,
+                 min_interval: float = 5.0, png_compression: int = 1, queue_size: int = 8):
+        """
+        Args:
+            directory (str): Folder the PNGs are written to (created on first write).
+            max_files (int): Newest snapshots kept; older ones are deleted.
+            max_bytes (int): Total size the snapshots may take up.
+            min_interval (float): Minimum seconds between two snapshots of the same key.
+            png_compression (int): cv2 PNG compression level (0-9); low is fast.
+            queue_size (int): Pending snapshots; further failures are dropped while it is full.
+        """
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.min_interval = min_interval
+        self.png_compression = png_compression
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._last = {}  # key -> (timestamp, pixel digest)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, key: str, image_rgb: np.ndarray) -> bool:
+        """
+        Queues `image_rgb` as the failure snapshot for `key`. Returns False if it was
+        dropped as a duplicate, rate limited, or because the queue is full.
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(image_rgb).data, digest_size=8).digest()
+        now = time.time()
+        with self._lock:
+            last_time, last_digest = self._last.get(key, (0.0, None))
+            if digest == last_digest:
+                logger.debug(f"Skipping failure snapshot for '{key}': screen unchanged since the last one.")
+                return False
+            if now - last_time < self.min_interval:
+                logger.debug(f"Skipping failure snapshot for '{key}': rate limited.")
+                return False
+            self._last[key] = (now, digest)
+            self._ensure_worker()
+        try:
+            # Copy: the capture may be a view into a shared frame buffer.
+            self._queue.put_nowait((key, now, np.array(image_rgb, copy=True)))
+            return True
+        except queue.Full:
+            logger.warning(f"Failure snapshot queue full; dropped snapshot for '{key}'.")
+            return False
+
+    def flush(self, timeout: float = 5.0):
+        """Waits (up to `timeout`) for queued snapshots to be written."""
+        end_time = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < end_time:
+            time.sleep(0.05)
+
+    def clear(self) -> int:
+        """Waits for queued snapshots, then deletes every snapshot in the directory. Returns the number removed."""
+        self.flush()
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.startswith(SNAPSHOT_PREFIX):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.debug(f"Could not remove snapshot {entry.path}: {e}")
+        return removed
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="failure-snapshots", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            key, timestamp, image_rgb = self._queue.get()
+            try:
+                self._write(key, timestamp, image_rgb)
+                self._enforce_ring()
+            except Exception as e:
+                logger.error(f"Failed to save debug screenshot for '{key}': {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, key: str, timestamp: float, image_rgb: np.ndarray):
+        ok, encoded = cv2.imencode(".png", cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR),
+                                   [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression])
+        if not ok:
+            raise ValueError("PNG encoding failed")
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp)) + f"-{int(timestamp * 1000) % 1000:03d}"
+        path = os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{key}_{stamp}.png")
+        with open(path, "wb") as f:
+            f.write(encoded.tobytes())
+        logger.error(f"Debug screenshot saved to: {path}")
+
+    def _enforce_ring(self):
+        """Deletes the oldest snapshots beyond `max_files` or `max_bytes`."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.startswith(SNAPSHOT_PREFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort(reverse=True)  # Newest first
+
+        kept_bytes = 0
+        for index, (_, size, path) in enumerate(entries):
+            kept_bytes += size
+            if index >= self.max_files or kept_bytes > self.max_bytes:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.debug(f"Could not remove old snapshot {path}: {e}")
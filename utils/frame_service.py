@@ -0,0 +1,148 @@
+# frame_service.py
+"""
+Background frame-capture service.
+
+While a sequence runs, several waiters poll overlapping parts of the ADEN
+window. Instead of each one taking its own screenshot, this service grabs
+the whole window at a fixed rate into a small ring of preallocated RGB and
+grayscale buffers and publishes the newest one. Readers crop the shared
+frame with numpy slicing (no copy, no colour conversion).
+
+Crops are views into a ring slot that is reused `ring_size` frames later.
+Anything that holds on to pixels beyond the current step (e.g. a background
+OCR job) must `.copy()` them first.
+"""
+import time
+import threading
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from utils import screen_capture
+
+logger = logging.getLogger(__name__)
+
+# `timestamp` is taken just before the grab, so a frame with timestamp >= t
+# is guaranteed to show the screen as it was at or after t.
+Frame = namedtuple("Frame", "seq timestamp origin rgb gray")
+
+
+class FrameCaptureService:
+    """Captures a window region on a background thread into a ring of reusable buffers."""
+
+    def __init__(self, region_provider, fps: float = 10, ring_size: int = 4):
+        """
+        Args:
+            region_provider (callable): Returns the (left, top, width, height) to capture,
+                or None when there is nothing to capture yet.
+            fps (float): Target capture rate.
+            ring_size (int): Number of frame buffers to rotate through.
+        """
+        self._region_provider = region_provider
+        self.fps = fps
+        self._ring_size = max(2, ring_size)
+        self._ring = []
+        self._ring_shape = None
+        self._slot = 0
+        self._seq = 0
+        self._latest = None
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameCaptureService", daemon=True)
+        self._thread.start()
+        logger.info(f"Frame capture service started at {self.fps} fps.")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+        with self._cond:
+            self._latest = None
+            self._cond.notify_all()
+        logger.info("Frame capture service stopped.")
+
+    def _ensure_ring(self, width: int, height: int):
+        if self._ring_shape != (height, width):
+            self._ring = [(np.empty((height, width, 3), dtype=np.uint8),
+                           np.empty((height, width), dtype=np.uint8))
+                          for _ in range(self._ring_size)]
+            self._ring_shape = (height, width)
+            self._slot = 0
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            interval = 1.0 / max(self.fps, 0.1)
+            started = time.time()
+            try:
+                region = self._region_provider()
+                if region:
+                    left, top, width, height = (int(v) for v in region)
+                    self._ensure_ring(width, height)
+                    rgb, gray = self._ring[self._slot]
+                    screen_capture.get_backend().grab_into((left, top, width, height), rgb, gray)
+                    with self._cond:
+                        self._seq += 1
+                        self._latest = Frame(self._seq, started, (left, top), rgb, gray)
+                        self._cond.notify_all()
+                    self._slot = (self._slot + 1) % self._ring_size
+            except Exception as e:
+                logger.debug(f"Frame capture failed: {e}")
+            self._stop_event.wait(max(0.0, interval - (time.time() - started)))
+
+    def latest(self) -> Frame | None:
+        """Returns the most recently published frame without waiting."""
+        return self._latest
+
+    def wait_for_frame(self, newer_than: float = None, after_seq: int = None, timeout: float = 1.0) -> Frame | None:
+        """
+        Blocks until a frame captured at/after `newer_than` (and with seq > `after_seq`)
+        is available. Returns None on timeout or if the service is not running.
+        """
+        def _ready():
+            frame = self._latest
+            if frame is None:
+                return False
+            if newer_than is not None and frame.timestamp < newer_than:
+                return False
+            if after_seq is not None and frame.seq <= after_seq:
+                return False
+            return True
+
+        with self._cond:
+            if not self.is_running and not _ready():
+                return None
+            self._cond.wait_for(_ready, timeout=timeout)
+            return self._latest if _ready() else None
+
+    def crop(self, region: tuple, gray: bool = True, newer_than: float = None) -> np.ndarray | None:
+        """
+        Returns a zero-copy view of `region` from the shared frame, or None if no
+        suitable frame is available or the region is not fully inside the frame.
+        """
+        left, top, width, height = (int(v) for v in region)
+        frame = self._latest
+        if frame is not None:
+            x, y = left - frame.origin[0], top - frame.origin[1]
+            if x < 0 or y < 0 or x + width > frame.gray.shape[1] or y + height > frame.gray.shape[0]:
+                return None
+        if newer_than is not None:
+            frame = self.wait_for_frame(newer_than=newer_than, timeout=2.0 / max(self.fps, 0.1))
+        if frame is None:
+            return None
+        x, y = left - frame.origin[0], top - frame.origin[1]
+        source = frame.gray if gray else frame.rgb
+        if x < 0 or y < 0 or x + width > source.shape[1] or y + height > source.shape[0]:
+            return None
+        return source[y:y + height, x:x + width]
@@ -0,0 +1,203 @@
+# glyph_recognizer.py
+"""
+Glyph-template recognizer for fields ADEN draws in its fixed UI font.
+
+A crop is binarised, split into characters at blank columns (column
+projection), and every glyph is normalised to a small fixed-size vector and
+compared against a learned template set with one matrix product (cosine
+similarity, nearest neighbour). A blank run wider than half the median glyph
+width is read as a space. When any glyph's best similarity is below the
+confidence threshold the crop is rejected and the caller falls back to
+Tesseract.
+
+The template set is learned from validated captures: OCR captures stored by
+utils/debug_capture_store.py for jobs that were saved to the database, with
+the saved value as the ground truth.
+
+Usage:
+    python -m utils.glyph_recognizer --captures debug_captures.db --jobs jobs.db
+"""
+import sys
+import sqlite3
+import argparse
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+from utils.app_paths import data_path
+from utils.ocr_cache import ink_mask
+
+logger = logging.getLogger(__name__)
+
+GLYPH_SIZE = (12, 16)  # (width, height) every glyph is normalised to
+MIN_GLYPH_CONFIDENCE = 0.92
+# A blank run between glyphs wider than this fraction of the median glyph width is a space.
+SPACE_GAP_RATIO = 0.5
+DEFAULT_TEMPLATES_PATH = data_path("glyph_templates.npz")
+# Captured field -> jobs table column holding its validated value.
+TRAINING_FIELDS = {"job_ref": "job_ref", "customer_no": "customer_no", "date": "job_date"}
+
+
+def segment_glyphs(mask: np.ndarray) -> tuple[list[np.ndarray], np.ndarray]:
+    """
+    Splits a text mask into per-character masks at blank columns, cropped to the line's ink rows.
+    Returns (glyph masks, widths of the blank runs between consecutive glyphs).
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return [], np.empty(0, int)
+    line = mask[rows[0]:rows[-1] + 1]
+    inked = line.any(axis=0)
+    # Starts/ends of runs of inked columns.
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], inked, [False])).astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    return [line[:, start:end] for start, end in zip(starts, ends)], starts[1:] - ends[:-1]
+
+
+def glyph_vectors(glyphs: list[np.ndarray]) -> np.ndarray:
+    """Normalises glyph masks to unit-length float vectors (one row per glyph)."""
+    if not glyphs:
+        return np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), np.float32)
+    vectors = np.stack([cv2.resize(g.astype(np.float32), GLYPH_SIZE, interpolation=cv2.INTER_AREA).ravel()
+                        for g in glyphs])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+class GlyphRecognizer:
+    """Nearest-neighbour glyph classifier over a learned template set."""
+
+    def __init__(self, path: str = DEFAULT_TEMPLATES_PATH, min_confidence: float = MIN_GLYPH_CONFIDENCE):
+        self.path = path
+        self.min_confidence = min_confidence
+        self.labels = np.empty(0, dtype="<U1")
+        self.templates = np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), np.float32)
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def is_trained(self) -> bool:
+        return len(self.labels) > 0
+
+    def recognize(self, image: np.ndarray) -> tuple[str | None, float]:
+        """
+        Reads a single-line crop. Returns (text, confidence) where confidence is the weakest
+        glyph's similarity. Text is None if the crop is blank, nothing is learned yet, or any
+        glyph matches no template with at least `min_confidence` (an unknown glyph).
+        """
+        mask = ink_mask(image)
+        if mask is None or not self.is_trained:
+            return None, 0.0
+        glyphs, gaps = segment_glyphs(mask)
+        if not glyphs:
+            return None, 0.0
+        vectors = glyph_vectors(glyphs)
+        with self._lock:
+            similarities = vectors @ self.templates.T
+            best = similarities.argmax(axis=1)
+            labels = self.labels[best].tolist()
+        confidence = float(similarities[np.arange(len(best)), best].min())
+        if confidence < self.min_confidence:
+            return None, confidence
+        spaces = gaps > SPACE_GAP_RATIO * np.median([glyph.shape[1] for glyph in glyphs])
+        text = labels[0] + "".join((" " if space else "") + label for space, label in zip(spaces, labels[1:]))
+        return text, confidence
+
+    def learn(self, image: np.ndarray, text: str) -> bool:
+        """
+        Adds the glyphs of a crop whose correct text is known. Skipped (False) if the crop
+        doesn't segment into exactly one glyph per non-space character.
+        """
+        chars = [c for c in text if not c.isspace()]
+        mask = ink_mask(image)
+        if mask is None or not chars:
+            return False
+        glyphs, _ = segment_glyphs(mask)
+        if len(glyphs) != len(chars):
+            return False
+        vectors = glyph_vectors(glyphs)
+        with self._lock:
+            if self.is_trained:
+                # Only keep glyph shapes that aren't already represented for their label.
+                similarities = vectors @ self.templates.T
+                known = np.array([(similarities[i][self.labels == c] > 0.99).any() for i, c in enumerate(chars)])
+            else:
+                known = np.zeros(len(chars), dtype=bool)
+            self.labels = np.concatenate([self.labels, np.array(chars, dtype="<U1")[~known]])
+            self.templates = np.vstack([self.templates, vectors[~known]])
+        return True
+
+    def load(self):
+        try:
+            with np.load(self.path) as data:
+                self.labels, self.templates = data["labels"], data["templates"].astype(np.float32)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable glyph templates {self.path}: {e}")
+
+    def save(self):
+        with self._lock:
+            np.savez_compressed(self.path, labels=self.labels, templates=self.templates)
+
+
+def build_from_captures(recognizer: GlyphRecognizer, captures_db: str, jobs_db: str) -> dict:
+    """
+    Learns glyphs from stored OCR captures of jobs saved in the jobs database.
+    Returns {field: (samples_used, samples_seen)}.
+    """
+    with sqlite3.connect(jobs_db) as conn:
+        jobs = {row[0]: row for row in conn.execute(
+            f"SELECT job_ref, {', '.join(TRAINING_FIELDS.values())} FROM jobs")}
+    columns = list(TRAINING_FIELDS.values())
+    report = {}
+    with sqlite3.connect(captures_db) as conn:
+        rows = conn.execute("SELECT job_ref, field, png FROM debug_captures WHERE status = 'ok' AND field IN (%s)"
+                            % ",".join("?" * len(TRAINING_FIELDS)), list(TRAINING_FIELDS)).fetchall()
+    for job_ref, field, png in rows:
+        used, seen = report.get(field, (0, 0))
+        job = jobs.get(job_ref)
+        truth = job[1 + columns.index(TRAINING_FIELDS[field])] if job else None
+        ok = False
+        if truth:
+            image = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+            ok = image is not None and recognizer.learn(image, str(truth))
+        report[field] = (used + ok, seen + 1)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build glyph templates from validated OCR captures.")
+    parser.add_argument("--captures", default=data_path("debug_captures.db"), help="Debug capture store.")
+    parser.add_argument("--jobs", default=data_path("jobs.db"), help="Jobs database with validated values.")
+    parser.add_argument("--out", default=DEFAULT_TEMPLATES_PATH, help="Glyph template file to update.")
+    args = parser.parse_args(argv)
+
+    recognizer = GlyphRecognizer(args.out)
+    before = len(recognizer.labels)
+    for field, (used, seen) in build_from_captures(recognizer, args.captures, args.jobs).items():
+        print(f"{field}: learned from {used} of {seen} captures")
+    recognizer.save()
+    print(f"{len(recognizer.labels)} glyph templates ({len(recognizer.labels) - before} new), "
+          f"covering: {''.join(sorted(set(recognizer.labels.tolist())))}")
+    return 0
+
+
+_RECOGNIZER = None
+_RECOGNIZER_LOCK = threading.Lock()
+
+
+def get_glyph_recognizer() -> GlyphRecognizer:
+    """Returns the shared recognizer, loading the template set on first use."""
+    global _RECOGNIZER
+    if _RECOGNIZER is None:
+        with _RECOGNIZER_LOCK:
+            if _RECOGNIZER is None:
+                _RECOGNIZER = GlyphRecognizer()
+    return _RECOGNIZER
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# keyword_matcher.py
+"""
+Tool subject detection.
+
+A job's tool subject (the brand it is booked against) is found in its
+description text. All brand keywords and model-number prefixes (e.g.
+Milwaukee "M18", Makita "DHP") are compiled once into a single
+case-insensitive alternation, so tagging a description line is one regex
+scan instead of a loop over every keyword.
+
+The first line that holds any term decides, and within it the term listed
+first wins: the brand keywords in TOOL_SUBJECT_KEYWORDS order, then the
+model prefixes. Terms must start a word ("M18" in "M18FPD2", not in
+"XM18"), so a brand name inside another word no longer tags a job.
+
+Model prefixes come from model_prefixes.json ({subject: [prefix, ...]}) and
+are loaded once. The same matcher backfills tool_subject for jobs already in
+the database.
+
+Usage:
+    python -m utils.keyword_matcher              # tag jobs without a tool subject
+    python -m utils.keyword_matcher --overwrite  # re-tag every job
+"""
+import re
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+import logging
+
+from core.db import DB_NAME
+from utils.app_paths import resource_path
+
+logger = logging.getLogger(__name__)
+
+TOOL_SUBJECT_KEYWORDS = [
+    "Makita", "DeWalt", "Milwaukee", "Bosch", "Hikoki", "Bayer", "Gensafe", "Hush100",
+    "Hush150", "Hush70", "Hush50", "EGO", "Paslode", "Battery"
+]
+MODEL_PREFIXES_PATH = resource_path("model_prefixes.json")
+
+
+def load_model_prefixes(path: str = MODEL_PREFIXES_PATH) -> dict:
+    """Returns {subject: [prefix, ...]} from `path`, or {} if the file is missing or unreadable."""
+    try:
+        with open(path, "r") as f:
+            return {subject: list(prefixes) for subject, prefixes in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable model prefix file {path}: {e}")
+        return {}
+
+
+class KeywordMatcher:
+    """Finds the highest-priority brand keyword or model prefix in a text with one compiled regex."""
+
+    def __init__(self, keywords=TOOL_SUBJECT_KEYWORDS, model_prefixes: dict = None):
+        # Matched term (lower case) -> tool subject, in priority order. Keywords name themselves;
+        # prefixes their brand.
+        self.subjects = {k.lower(): k for k in keywords}
+        for subject, prefixes in (model_prefixes or {}).items():
+            for prefix in prefixes:
+                self.subjects.setdefault(prefix.lower(), subject)
+        self._ranks = {term: rank for rank, term in enumerate(self.subjects)}
+        # A lookahead reports every word start holding a term, not only non-overlapping matches, and
+        # the alternation is in priority order so each start reports its highest-priority term.
+        self._pattern = re.compile(r"(?<![A-Za-z0-9])(?=(%s))" % "|".join(map(re.escape, self.subjects)),
+                                   re.IGNORECASE) if self.subjects else None
+
+    def find(self, text: str) -> str | None:
+        """The tool subject of the highest-priority term on the first line of `text` holding one, or None."""
+        if not text or self._pattern is None:
+            return None
+        for line in text.splitlines():
+            terms = [match.group(1).lower() for match in self._pattern.finditer(line)]
+            if terms:
+                return self.subjects[min(terms, key=self._ranks.__getitem__)]
+        return None
+
+
+def backfill_tool_subjects(db_path: str = DB_NAME, matcher: KeywordMatcher = None,
+                           overwrite: bool = False, dry_run: bool = False) -> list[tuple]:
+    """
+    Tags jobs from their stored description. Only jobs without a tool subject are changed
+    unless `overwrite`. Returns [(job_ref, old_subject, new_subject)] for the changed jobs.
+    """
+    matcher = matcher or get_keyword_matcher()
+    with sqlite3.connect(db_path) as conn:
+        changes = []
+        for job_ref, description, subject in conn.execute("SELECT job_ref, description, tool_subject FROM jobs"):
+            if subject and not overwrite:
+                continue
+            found = matcher.find(description)
+            if found and found != subject:
+                changes.append((job_ref, subject, found))
+        if not dry_run:
+            conn.executemany("UPDATE jobs SET tool_subject = ? WHERE job_ref = ?",
+                             [(new, job_ref) for job_ref, _, new in changes])
+    return changes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tag jobs with a tool subject from their description.")
+    parser.add_argument("--db", default=DB_NAME, help="Jobs database.")
+    parser.add_argument("--prefixes", default=MODEL_PREFIXES_PATH, help="Model prefix file.")
+    parser.add_argument("--overwrite", action="store_true", help="Re-tag jobs that already have a tool subject.")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the changes.")
+    args = parser.parse_args(argv)
+
+    matcher = KeywordMatcher(model_prefixes=load_model_prefixes(args.prefixes))
+    changes = backfill_tool_subjects(args.db, matcher, overwrite=args.overwrite, dry_run=args.dry_run)
+    for job_ref, old_subject, new_subject in changes:
+        print(f"{job_ref:<12} {old_subject or '-'!s:<12} -> {new_subject}")
+    print(f"{len(changes)} jobs {'to tag' if args.dry_run else 'tagged'}.")
+    return 0
+
+
+_MATCHER = None
+_MATCHER_LOCK = threading.Lock()
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Returns the shared matcher, compiling it (and loading the model prefixes) on first use."""
+    global _MATCHER
+    if _MATCHER is None:
+        with _MATCHER_LOCK:
+            if _MATCHER is None:
+                _MATCHER = KeywordMatcher(model_prefixes=load_model_prefixes())
+    return _MATCHER
+
+
+if __name__ == "__main__":
+    sys.exit(main())
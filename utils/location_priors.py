@@ -0,0 +1,123 @@
+# location_priors.py
+"""
+Learned location priors for static targets.
+
+Buttons and labels such as the Save button or the reference field label
+appear at almost the same spot in the ADEN window every time. This module
+remembers where each target was last matched (relative to the window) and
+predicts a tight ROI around those positions. The locator searches that ROI
+first and only falls back to the full calibrated region on a miss, since
+matching cost scales with the searched area.
+
+Per-target hit/miss counts are persisted with the positions so the payoff
+can be checked over time.
+"""
+import os
+import json
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LocationPriors:
+    """Window-relative position history and prior hit-rate per target key."""
+
+    def __init__(self, path: str, history: int = 20, pad: int = 6, min_samples: int = 2,
+                 save_interval: float = 30.0):
+        """
+        Args:
+            path (str): JSON file the priors are persisted to.
+            history (int): Number of recent positions kept per target.
+            pad (int): Pixels added around the observed positions when predicting.
+            min_samples (int): Matches needed before a prediction is made.
+            save_interval (float): Minimum seconds between automatic saves.
+        """
+        self.path = path
+        self.history = history
+        self.pad = pad
+        self.min_samples = min_samples
+        self.save_interval = save_interval
+        self._data = {}
+        self._dirty = False
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def predict(self, key: str) -> tuple | None:
+        """Returns a window-relative (left, top, width, height) ROI to try first, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if not entry or len(entry["positions"]) < self.min_samples:
+                return None
+            xs = [p[0] for p in entry["positions"]]
+            ys = [p[1] for p in entry["positions"]]
+            width, height = entry["size"]
+        left, top = min(xs) - self.pad, min(ys) - self.pad
+        return (left, top,
+                max(xs) - min(xs) + width + 2 * self.pad,
+                max(ys) - min(ys) + height + 2 * self.pad)
+
+    def record(self, key: str, rel_left: int, rel_top: int, width: int, height: int, prior_hit: bool = None):
+        """
+        Records a successful match at a window-relative position. `prior_hit` is True if
+        it was found inside the predicted ROI, False if only the full-region fallback found
+        it, and None if no prediction was tried.
+        """
+        with self._lock:
+            entry = self._data.setdefault(key, {"positions": [], "size": [width, height], "hits": 0, "misses": 0})
+            entry["positions"].append([int(rel_left), int(rel_top)])
+            del entry["positions"][:-self.history]
+            entry["size"] = [int(width), int(height)]
+            if prior_hit is True:
+                entry["hits"] += 1
+            elif prior_hit is False:
+                entry["misses"] += 1
+            self._dirty = True
+        if time.time() - self._saved_at > self.save_interval:
+            self.save()
+
+    def stats(self) -> dict:
+        """Returns {key: {"hits", "misses", "hit_rate"}} for every tracked target."""
+        with self._lock:
+            out = {}
+            for key, entry in self._data.items():
+                tries = entry["hits"] + entry["misses"]
+                out[key] = {"hits": entry["hits"], "misses": entry["misses"],
+                            "hit_rate": entry["hits"] / tries if tries else 0.0}
+            return out
+
+    def forget(self, key: str = None):
+        """Drops the history for one target (or all), e.g. after the UI layout changes."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+            self._dirty = True
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable location priors file {self.path}: {e}")
+            self._data = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._data, indent=2, sort_keys=True)
+            self._dirty = False
+            self._saved_at = time.time()
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save location priors: {e}")
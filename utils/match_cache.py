@@ -0,0 +1,63 @@
+# match_cache.py
+"""
+LRU cache of template match results keyed by the pixels that were searched.
+
+A match of the same template against byte-identical pixels always gives
+the same answer, and successive steps often search the same static region
+(e.g. the Save button, the No Print label). The ROI is hashed with a fast
+64-bit BLAKE2b digest, which is far cheaper than re-running matchTemplate.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class MatchCache:
+    """Thread-safe LRU of (template key, template version, ROI hash) -> (confidence, (x, y))."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(template_key: str, template_version, roi: np.ndarray) -> tuple:
+        # Views into a shared frame are not contiguous; hashing needs a flat buffer.
+        digest = hashlib.blake2b(np.ascontiguousarray(roi), digest_size=8).digest()
+        return template_key, template_version, roi.shape, digest
+
+    def get(self, cache_key: tuple):
+        with self._lock:
+            value = self._entries.get(cache_key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return value
+
+    def put(self, cache_key: tuple, value):
+        with self._lock:
+            self._entries[cache_key] = value
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
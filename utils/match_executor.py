@@ -0,0 +1,93 @@
+# match_executor.py
+"""
+Thread pool for template matching.
+
+cv2.matchTemplate releases the GIL, so matching several templates against
+the same frame (state classification, all-targets checks) or one template
+against bands of a large frame scales across cores with plain threads.
+"""
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from utils.vision import match_template
+
+logger = logging.getLogger(__name__)
+
+# Leave one core for the UI thread and the capture service.
+DEFAULT_MATCH_WORKERS = max(2, min(8, (os.cpu_count() or 2) - 1))
+
+
+class MatchExecutor:
+    """Fans template matches out over a thread pool."""
+
+    def __init__(self, max_workers: int = DEFAULT_MATCH_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="match")
+
+    def submit(self, haystack: np.ndarray, template: np.ndarray):
+        """Schedules one match; the future resolves to (confidence, (x, y))."""
+        return self._pool.submit(match_template, haystack, template)
+
+    def match_many(self, jobs):
+        """
+        Matches several (label, haystack, template) jobs concurrently and yields
+        (label, confidence, (x, y)) tuples in completion order.
+        """
+        futures = {self.submit(haystack, template): label for label, haystack, template in jobs}
+        for future in as_completed(futures):
+            score, loc = future.result()
+            yield futures[future], score, loc
+
+    def match_tiled(self, haystack: np.ndarray, template: np.ndarray, tiles: int = None) -> tuple[float, tuple[int, int]]:
+        """
+        Matches one template against a large haystack split into overlapping
+        horizontal bands, one per worker. Same result as match_template.
+        """
+        th = template.shape[0]
+        tiles = min(tiles or self.max_workers, max(1, haystack.shape[0] // (th * 2)))
+        if tiles <= 1:
+            return match_template(haystack, template)
+
+        band = -(-(haystack.shape[0] - th + 1) // tiles)  # Start rows per band (ceil)
+        futures = []
+        for start in range(0, haystack.shape[0] - th + 1, band):
+            # Each band overlaps the next by th-1 rows so no position is missed.
+            futures.append((start, self.submit(haystack[start:start + band + th - 1], template)))
+
+        best_score, best_loc = 0.0, (0, 0)
+        for start, future in futures:
+            score, (x, y) = future.result()
+            if score > best_score:
+                best_score, best_loc = score, (x, y + start)
+        return best_score, best_loc
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_match_executor() -> MatchExecutor:
+    """Returns the shared match executor, creating it on first use."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = MatchExecutor()
+                logger.info(f"Template match pool started with {_EXECUTOR.max_workers} workers.")
+    return _EXECUTOR
+
+
+def set_match_workers(max_workers: int):
+    """Replaces the shared executor with one of a different size."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown()
+        _EXECUTOR = MatchExecutor(max_workers=max(1, int(max_workers)))
@@ -0,0 +1,153 @@
+# ocr_cache.py
+"""
+OCR result cache.
+
+Re-scraping an unchanged job card OCRs exactly the same pixels again. This
+cache keys results by (profile, hash of the crop) and answers repeats
+without calling Tesseract, from an in-memory LRU backed optionally by SQLite
+so results survive restarts.
+
+The hash is taken over the crop after binarising it and trimming
+blank margins, so anti-aliasing noise, brightness drift and small position
+shifts of the text inside the crop map to the same key. A coarse
+perceptual hash (e.g. 8x8 dHash) is deliberately not used: it cannot tell
+job refs that differ in a single digit apart.
+"""
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from utils.ocr_engine import OcrResult
+
+logger = logging.getLogger(__name__)
+
+
+def ink_bounds(binary: np.ndarray) -> tuple | None:
+    """(top, bottom, left, right) of the non-zero pixels via row/column projections, or None if blank."""
+    rows = np.flatnonzero(binary.any(axis=1))
+    cols = np.flatnonzero(binary.any(axis=0))
+    if rows.size == 0:
+        return None
+    return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+def ink_mask(image: np.ndarray) -> np.ndarray | None:
+    """Boolean mask of the text pixels of an RGB or grayscale crop, or None if it is blank."""
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if image.ndim == 3 else image
+    low, high = int(gray.min()), int(gray.max())
+    if high - low < 16:
+        return None
+    # Threshold halfway between the darkest and lightest pixel: anti-aliased edge pixels are a
+    # blend of ink and background, so this cut is independent of the background brightness.
+    mask = gray > (low + high) // 2
+    # Text is the minority class whichever way round the colours are.
+    return ~mask if mask.mean() > 0.5 else mask
+
+
+def content_hash(image: np.ndarray) -> str:
+    """Hash of the binarised, margin-trimmed crop."""
+    binary = ink_mask(image)
+    if binary is None:
+        return "blank"
+    bounds = ink_bounds(binary)
+    if bounds is None:
+        return "blank"
+    top, bottom, left, right = bounds
+    ink = np.ascontiguousarray(binary[top:bottom, left:right])
+    digest = hashlib.blake2b(np.packbits(ink).tobytes(), digest_size=12)
+    digest.update(np.array(ink.shape, dtype=np.int32).tobytes())
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """In-memory LRU of OCR results with optional SQLite persistence."""
+
+    def __init__(self, max_entries: int = 2048, db_path: str = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ocr_cache (
+                        profile TEXT,
+                        hash TEXT,
+                        text TEXT,
+                        confidence REAL,
+                        updated REAL,
+                        PRIMARY KEY (profile, hash)
+                    )""")
+
+    def get(self, profile: str, digest: str) -> OcrResult | None:
+        key = (profile, digest)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+        if result is None and self.db_path:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute("SELECT text, confidence FROM ocr_cache WHERE profile = ? AND hash = ?",
+                                   key).fetchone()
+            if row:
+                result = OcrResult(row[0], row[1], 0.0, "cache")
+                self._remember(key, result)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, profile: str, digest: str, result: OcrResult):
+        cached = OcrResult(result.text, result.confidence, 0.0, "cache")
+        self._remember((profile, digest), cached)
+        if self.db_path:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.execute("INSERT OR REPLACE INTO ocr_cache (profile, hash, text, confidence, updated) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 (profile, digest, result.text, result.confidence, time.time()))
+            except sqlite3.Error as e:
+                logger.debug(f"Could not persist OCR cache entry: {e}")
+
+    def _remember(self, key: tuple, result: OcrResult):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def recognize(self, engine, image: np.ndarray, config: str = "", profile: str = "") -> OcrResult:
+        """
+        Returns the cached result for this crop under `profile` (plus `config`), or runs
+        `engine.recognize` and caches what it returns.
+        """
+        profile = f"{profile}|{config}"
+        digest = content_hash(image)
+        result = self.get(profile, digest)
+        if result is None:
+            result = engine.recognize(image, config)
+            self.put(profile, digest, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("DELETE FROM ocr_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,208 @@
+# ocr_engine.py
+"""
+Shared OCR service.
+
+pytesseract starts a new tesseract process (and reloads the language data)
+for every call. When the `tesserocr` binding is installed, this module keeps
+a small pool of warm in-process Tesseract engines alive for the lifetime of
+the app instead; otherwise it falls back to pytesseract. Callers pass the
+same Tesseract config strings either way ("--psm 7 -c tessedit_char_whitelist=...")
+and every call's latency is recorded per backend.
+"""
+import os
+import time
+import shlex
+import queue
+import threading
+import logging
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:  # Optional: falls back to pytesseract
+    tesserocr = None
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OCR_ENGINES = 2
+DEFAULT_PSM = 3  # Tesseract's own default (fully automatic page segmentation)
+
+# text: recognised text; confidence: lowest word confidence 0-100 (-1 if unknown), so a
+# single doubtful word marks the whole field;
+# latency: seconds spent in the engine; backend: "tesserocr" or "pytesseract".
+OcrResult = namedtuple("OcrResult", "text confidence latency backend")
+
+
+def parse_config(config: str) -> tuple[int, dict]:
+    """Splits a Tesseract CLI config string into (psm, {variable: value})."""
+    psm, variables = DEFAULT_PSM, {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1]); i += 1
+        elif token == "-c" and i + 1 < len(tokens) and "=" in tokens[i + 1]:
+            name, value = tokens[i + 1].split("=", 1)
+            variables[name] = value; i += 1
+        elif token in ("--oem", "-l") and i + 1 < len(tokens):
+            i += 1  # Engines are initialised with the default OEM and language
+        i += 1
+    return psm, variables
+
+
+def _to_pil(image) -> Image.Image:
+    return image if isinstance(image, Image.Image) else Image.fromarray(np.ascontiguousarray(image))
+
+
+class OcrEngine:
+    """Pool of warm Tesseract engines with a pytesseract fallback and latency metrics."""
+
+    def __init__(self, size: int = DEFAULT_OCR_ENGINES, lang: str = "eng", use_binding: bool = True):
+        self.size = size
+        self.lang = lang
+        self.backend = "tesserocr" if (use_binding and tesserocr is not None) else "pytesseract"
+        self._pool = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._latencies = {}  # backend -> deque of recent call latencies
+        self._calls = {}
+        self._executor = None
+
+    @contextmanager
+    def _engine(self):
+        """Borrows an engine from the pool, creating one if the pool isn't full yet."""
+        try:
+            api = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                kwargs = {"path": os.environ["TESSDATA_PREFIX"]} if os.environ.get("TESSDATA_PREFIX") else {}
+                api = tesserocr.PyTessBaseAPI(lang=self.lang, **kwargs)
+            else:
+                api = self._pool.get()
+        try:
+            yield api
+        finally:
+            self._pool.put(api)
+
+    def _record(self, backend: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(backend, deque(maxlen=500)).append(latency)
+            self._calls[backend] = self._calls.get(backend, 0) + 1
+
+    def _recognize_binding(self, image, psm: int, variables: dict) -> tuple[str, float]:
+        with self._engine() as api:
+            previous = {name: api.GetVariableAsString(name) for name in variables}
+            try:
+                api.SetPageSegMode(psm)
+                for name, value in variables.items():
+                    api.SetVariable(name, value)
+                api.SetImage(_to_pil(image))
+                text = api.GetUTF8Text()
+                confidences = api.AllWordConfidences()
+            finally:
+                # Variables stick to the engine; restore them for the next borrower.
+                for name, value in previous.items():
+                    api.SetVariable(name, value or "")
+        return text, (float(min(confidences)) if confidences else -1.0)
+
+    @staticmethod
+    def _recognize_pytesseract(image, config: str) -> tuple[str, float]:
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        lines, confidences = {}, []
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if confidence < 0:
+                continue
+            line_key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(line_key, []).append(word)
+            if word.strip():
+                confidences.append(confidence)
+        text = "\n".join(" ".join(words).strip() for _, words in sorted(lines.items()))
+        return text, (float(min(confidences)) if confidences else -1.0)
+
+    def recognize(self, image, config: str = "") -> OcrResult:
+        """OCRs an image (numpy array or PIL image) and returns text plus its lowest word confidence."""
+        started = time.perf_counter()
+        if self.backend == "tesserocr":
+            psm, variables = parse_config(config)
+            try:
+                text, confidence = self._recognize_binding(image, psm, variables)
+            except RuntimeError as e:
+                # Typically missing language data for the binding; the CLI may still work.
+                logger.warning(f"tesserocr engine unavailable ({e}); falling back to pytesseract.")
+                self.backend = "pytesseract"
+                return self.recognize(image, config)
+        else:
+            text, confidence = self._recognize_pytesseract(image, config)
+        latency = time.perf_counter() - started
+        self._record(self.backend, latency)
+        return OcrResult(text, confidence, latency, self.backend)
+
+    def image_to_string(self, image, config: str = "") -> str:
+        """Drop-in replacement for pytesseract.image_to_string."""
+        if self.backend == "tesserocr":
+            return self.recognize(image, config).text
+        started = time.perf_counter()
+        text = pytesseract.image_to_string(image, config=config)
+        self._record(self.backend, time.perf_counter() - started)
+        return text
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Runs `fn` on the OCR worker pool (one worker per engine) and returns its Future,
+        so the caller can carry on while text is recognised in the background.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="ocr")
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        """Returns {backend: {"calls", "avg_ms", "p95_ms", "max_ms"}} over recent calls."""
+        with self._lock:
+            out = {}
+            for backend, latencies in self._latencies.items():
+                values = np.array(latencies) * 1000
+                out[backend] = {"calls": self._calls[backend], "avg_ms": float(values.mean()),
+                                "p95_ms": float(np.percentile(values, 95)), "max_ms": float(values.max())}
+            return out
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        while True:
+            try:
+                api = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            if hasattr(api, "End"):
+                api.End()
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_ocr_engine() -> OcrEngine:
+    """Returns the shared OCR engine, creating it on first use."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = OcrEngine()
+                logger.info(f"OCR engine: {_ENGINE.backend} (pool of {_ENGINE.size}).")
+                if _ENGINE.backend == "pytesseract":
+                    logger.warning("tesserocr is not installed: every OCR read starts a tesseract process. "
+                                   "Install tesserocr for in-process engines.")
+    return _ENGINE
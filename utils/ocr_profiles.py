@@ -0,0 +1,167 @@
+# ocr_profiles.py
+"""
+Per-field OCR profiles.
+
+Each field read by an `ocr_capture` step has a profile describing how its
+crop is prepared and how Tesseract is told to read it. Preprocessing is a
+short chain of whole-array operations: grayscale, trim blank margins using
+row/column ink projections, upscale, binarise, and add a white border
+(Tesseract reads dark text on white with some margin best). Smaller, cleaner
+inputs make each Tesseract call faster and more accurate.
+
+Fields drawn in ADEN's fixed UI font are first read by the glyph-template
+recognizer; Tesseract only runs when that isn't confident.
+
+Fields with a "min_confidence" are re-read when their weakest word scores
+below it: first with the profile's alternative preprocessing on the same
+crop, then (if the caller can still provide one) on a fresh capture, within
+a small retry budget.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from utils.glyph_recognizer import get_glyph_recognizer
+from utils.ocr_cache import ink_bounds
+from utils.ocr_engine import get_ocr_engine, OcrResult
+
+ALNUM = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# --- OCR PROFILES ---
+# "psm":       Tesseract page segmentation mode.
+# "whitelist": allowed characters (None -> any).
+# "scale":     resize factor applied after cropping.
+# "threshold": None (keep grayscale), "otsu", or a fixed 0-255 cut-off.
+# "autocrop":  trim blank margins around the text before scaling.
+# "border":    white margin (px) added around the final image.
+# "glyphs":    try the glyph-template recognizer (fixed-font fields) before Tesseract.
+# "min_confidence": lowest acceptable word confidence (0-100) before re-reading (None -> accept anything).
+# "alternates": profile overrides tried in order on the same crop when a read isn't confident.
+DEFAULT_PROFILE = {"psm": 3, "whitelist": None, "scale": 1.0, "threshold": None, "autocrop": False, "border": 0,
+                   "glyphs": False, "min_confidence": None, "alternates": ()}
+
+# Alternative preprocessing for single-line fields: a larger grayscale image (lets Tesseract do its
+# own binarisation of thin strokes), then a lighter fixed cut-off with more margin.
+LINE_ALTERNATES = ({"scale": 3.0, "threshold": None}, {"threshold": 160, "border": 20})
+# Re-reads allowed per field: alternates on the same crop first, then fresh captures.
+OCR_RETRY_BUDGET = 3
+
+OCR_PROFILES = {
+    "job_ref": {"psm": 7, "whitelist": ALNUM, "scale": 2.0, "threshold": "otsu", "autocrop": True, "border": 10,
+                "glyphs": True, "min_confidence": 80, "alternates": LINE_ALTERNATES},
+    "customer_no": {"psm": 7, "whitelist": ALNUM, "scale": 2.0, "threshold": "otsu", "autocrop": True, "border": 10,
+                    "glyphs": True, "min_confidence": 80, "alternates": LINE_ALTERNATES},
+    "customer_name": {"psm": 7, "whitelist": ALNUM, "scale": 2.0, "threshold": "otsu", "autocrop": True, "border": 10,
+                      "min_confidence": 60, "alternates": LINE_ALTERNATES},
+    "date": {"psm": 7, "whitelist": None, "scale": 2.0, "threshold": "otsu", "autocrop": True, "border": 10,
+             "glyphs": True, "min_confidence": 80, "alternates": LINE_ALTERNATES},
+    "Job_Class_Cond": {"psm": 10, "whitelist": None, "scale": 3.0, "threshold": "otsu", "autocrop": True, "border": 10,
+                       "min_confidence": 70, "alternates": ({"scale": 4.0, "threshold": None},)},
+    "descriptions": {"psm": 6, "whitelist": None, "scale": 1.5, "threshold": None, "autocrop": True, "border": 10},
+    # Text to the right of a located label (find_image_and_get_text)
+    "label_value": {"psm": 7, "whitelist": None, "scale": 2.0, "threshold": "otsu", "autocrop": True, "border": 10},
+}
+
+
+def get_profile(field: str) -> dict:
+    """The profile for `field`, with unspecified settings taken from DEFAULT_PROFILE."""
+    return {**DEFAULT_PROFILE, **OCR_PROFILES.get(field, {})}
+
+
+def build_config(profile: dict) -> str:
+    config = f"--oem 3 --psm {profile['psm']}"
+    if profile["whitelist"]:
+        config += f" -c tessedit_char_whitelist={profile['whitelist']}"
+    return config
+
+
+def preprocess(image: np.ndarray, profile: dict) -> np.ndarray:
+    """Applies a profile's preprocessing to an RGB or grayscale crop. Returns a grayscale array."""
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if image.ndim == 3 else image
+    low, high = int(gray.min()), int(gray.max())
+    if high - low < 16:
+        return gray  # Blank crop; nothing to enhance
+
+    # Dark text on a light background, whichever way round the field is drawn.
+    ink = gray < (low + high) // 2
+    if ink.mean() > 0.5:
+        gray, ink = 255 - gray, ~ink
+
+    if profile["autocrop"]:
+        top, bottom, left, right = ink_bounds(ink)
+        margin = 2
+        gray = gray[max(0, top - margin):bottom + margin, max(0, left - margin):right + margin]
+
+    if profile["scale"] != 1.0:
+        gray = cv2.resize(gray, None, fx=profile["scale"], fy=profile["scale"], interpolation=cv2.INTER_CUBIC)
+
+    threshold = profile["threshold"]
+    if threshold == "otsu":
+        _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    elif threshold is not None:
+        _, gray = cv2.threshold(gray, int(threshold), 255, cv2.THRESH_BINARY)
+
+    if profile["border"]:
+        gray = cv2.copyMakeBorder(gray, *([profile["border"]] * 4), cv2.BORDER_CONSTANT, value=255)
+    return np.ascontiguousarray(gray)
+
+
+def read_field(image: np.ndarray, field: str, cache=None, engine=None, overrides: dict = None) -> OcrResult:
+    """
+    OCRs a captured crop with the profile registered for `field` (the default profile
+    if there is none), with `overrides` applied on top. Goes through `cache` (an OcrCache)
+    when one is given.
+    """
+    profile = {**get_profile(field), **(overrides or {})}
+    if profile["glyphs"]:
+        started = time.perf_counter()
+        recognizer = get_glyph_recognizer()
+        text, confidence = recognizer.recognize(image)
+        if text is not None and confidence >= recognizer.min_confidence:
+            return OcrResult(text, confidence * 100, time.perf_counter() - started, "glyphs")
+    engine = engine or get_ocr_engine()
+    prepared = preprocess(image, profile)
+    config = build_config(profile)
+    if cache is not None:
+        # The cache hash is taken after binarising, so alternates must not share the profile's entries.
+        key = field if not overrides else f"{field}{sorted(overrides.items())}"
+        return cache.recognize(engine, prepared, config=config, profile=key)
+    return engine.recognize(prepared, config)
+
+
+def is_confident(result: OcrResult, field: str) -> bool:
+    """
+    True if `result` meets the field's minimum confidence (always, for fields without one).
+    An empty read has no word confidence (-1), so it is retried like any other weak read.
+    """
+    threshold = get_profile(field)["min_confidence"]
+    return threshold is None or result.confidence >= threshold
+
+
+def read_field_confident(image: np.ndarray, field: str, recapture=None, cache=None, engine=None,
+                         budget: int = OCR_RETRY_BUDGET) -> tuple[OcrResult, int]:
+    """
+    Reads a field and re-reads it while it isn't confident, up to `budget` times: first with
+    each of the profile's alternates on the same crop, then on fresh crops from `recapture()`
+    (a callable returning a new crop, or None once the field is no longer on screen).
+
+    Returns:
+        tuple: (the most confident result, number of re-reads made).
+    """
+    best = read_field(image, field, cache=cache, engine=engine)
+    alternates = get_profile(field)["alternates"]
+    retries = 0
+    while retries < budget and not is_confident(best, field):
+        if retries < len(alternates):
+            result = read_field(image, field, cache=cache, engine=engine, overrides=alternates[retries])
+        else:
+            fresh = recapture() if recapture else None
+            if fresh is None:
+                break
+            image = fresh
+            result = read_field(image, field, cache=cache, engine=engine)
+        retries += 1
+        if result.confidence > best.confidence:
+            best = result
+    return best, retries
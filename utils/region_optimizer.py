@@ -0,0 +1,164 @@
+# region_optimizer.py
+"""
+Proposes tighter search regions from the production match log.
+
+Hand-calibrated regions are often much larger than the template they hold.
+Template matching evaluates every position a template fits in the region,
+so the cost is proportional to (W - w + 1) * (H - h + 1); shrinking a region
+to the padded union of every observed match (kept inside the current region)
+cuts that directly.
+
+Some regions are also read as text: ocr_capture and classify_job_class
+targets, and find_image_in_region get_text targets, OCR their region, and
+find_image_and_get_text OCRs from the label to the region's right edge.
+Those regions hold more than the template, so keys the sequences use that
+way are never tightened. find_image_and_get_text isn't a sequence action:
+keys read with it must be given with --exclude.
+
+Usage:
+    python -m utils.region_optimizer            # report only
+    python -m utils.region_optimizer --write    # also rewrite search_regions.json (backup kept)
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+from utils.app_paths import BASE_DIR, data_path
+from utils.region_stats import read_match_boxes
+
+DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, "search_regions.json")
+DEFAULT_LOG_PATH = data_path("match_log.jsonl")
+DEFAULT_SEQUENCE_DIR = os.path.join(BASE_DIR, "AutoSequenceRepo")
+DEFAULT_WINDOW_SIZE = (945, 600)
+# Region classify_job_class reads when its step has no target (services/job_class.py JOB_CLASS_ROI_KEY).
+JOB_CLASS_ROI_KEY = "JOB_CLASS_COND"
+
+
+def ocr_region_keys(sequence_dir: str = DEFAULT_SEQUENCE_DIR) -> set[str]:
+    """Keys whose search region a sequence in `sequence_dir` reads text from."""
+    keys = set()
+    if not os.path.isdir(sequence_dir):
+        return keys
+    for name in sorted(os.listdir(sequence_dir)):
+        if not name.lower().endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(sequence_dir, name), "r", encoding="utf-8") as f:
+                steps = json.load(f).get("steps", [])
+        except (OSError, ValueError, AttributeError):
+            continue
+        for step in steps:
+            if not isinstance(step, dict):
+                continue
+            action, target = step.get("action"), step.get("target_image")
+            param1 = (step.get("parameters") or {}).get("param1")
+            if action == "ocr_capture" and target:
+                keys.add(target)
+            elif action == "classify_job_class":
+                keys.add(target or JOB_CLASS_ROI_KEY)
+            elif action == "find_image_in_region" and param1 == "get_text" and target:
+                keys.add(target)
+    return keys
+
+
+def match_positions(region_size: tuple, template_size: tuple) -> int:
+    """Number of positions a template is evaluated at inside a region."""
+    return max(1, region_size[0] - template_size[0] + 1) * max(1, region_size[1] - template_size[1] + 1)
+
+
+def propose_regions(boxes: dict, regions: dict, pad: int = 10, min_samples: int = 5,
+                    window_size: tuple = DEFAULT_WINDOW_SIZE, exclude=()) -> dict:
+    """
+    Proposes a padded bounding region per calibrated key from its observed match boxes,
+    clipped to the key's current region (a proposal never grows a region in any direction).
+
+    Args:
+        boxes (dict): {key: [(left, top, width, height), ...]} window-relative match boxes.
+        regions (dict): Current search_regions.json contents.
+        pad (int): Margin kept around the union of observed matches.
+        min_samples (int): Keys with fewer observed matches are left alone.
+        exclude: Keys never to tighten (regions that are also read as text).
+
+    Returns:
+        dict: {key: {"current", "proposed", "samples", "speedup"}} for keys whose region would shrink.
+    """
+    proposals = {}
+    for key, key_boxes in boxes.items():
+        current = regions.get(key)
+        if not current or key in exclude or len(key_boxes) < min_samples:
+            continue
+        left = max(0, current["left"], min(b[0] for b in key_boxes) - pad)
+        top = max(0, current["top"], min(b[1] for b in key_boxes) - pad)
+        right = min(window_size[0], current["left"] + current["width"], max(b[0] + b[2] for b in key_boxes) + pad)
+        bottom = min(window_size[1], current["top"] + current["height"], max(b[1] + b[3] for b in key_boxes) + pad)
+        if right <= left or bottom <= top:
+            continue  # Matches logged outside today's region (it was recalibrated since)
+        proposed = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        if proposed["width"] * proposed["height"] >= current["width"] * current["height"]:
+            continue
+
+        template_size = (max(b[2] for b in key_boxes), max(b[3] for b in key_boxes))
+        before = match_positions((current["width"], current["height"]), template_size)
+        after = match_positions((proposed["width"], proposed["height"]), template_size)
+        proposals[key] = {"current": dict(current), "proposed": proposed,
+                          "samples": len(key_boxes), "speedup": before / after}
+    return proposals
+
+
+def format_report(proposals: dict) -> str:
+    if not proposals:
+        return "No regions can be tightened with the matches logged so far."
+    lines = [f"{'KEY':<32} {'SAMPLES':>7}  {'CURRENT':>9} -> {'PROPOSED':<9} {'SPEEDUP':>8}"]
+    for key, p in sorted(proposals.items(), key=lambda item: -item[1]["speedup"]):
+        current, proposed = p["current"], p["proposed"]
+        lines.append(f"{key:<32} {p['samples']:>7}  {current['width']:>4}x{current['height']:<4} -> "
+                     f"{proposed['width']:>4}x{proposed['height']:<4} {p['speedup']:>7.1f}x")
+    return "\n".join(lines)
+
+
+def write_regions(config_path: str, regions: dict, proposals: dict) -> str:
+    """Applies `proposals` to `regions`, backing up the current file first. Returns the backup path."""
+    backup_path = f"{config_path}.bak-{time.strftime('%Y%m%d-%H%M%S')}"
+    if os.path.exists(config_path):
+        shutil.copy2(config_path, backup_path)
+    for key, p in proposals.items():
+        regions[key] = dict(p["proposed"])
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(regions, f, indent=2, sort_keys=True)
+    return backup_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Propose tighter search regions from logged matches.")
+    parser.add_argument("--log", default=DEFAULT_LOG_PATH, help="Match log written by the app.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="search_regions.json to optimize.")
+    parser.add_argument("--pad", type=int, default=10, help="Margin around the observed matches (px).")
+    parser.add_argument("--min-samples", type=int, default=5, help="Matches required before a key is tightened.")
+    parser.add_argument("--sequences", default=DEFAULT_SEQUENCE_DIR,
+                        help="Sequence folder; regions its steps OCR are never tightened.")
+    parser.add_argument("--exclude", nargs="+", default=[], help="More keys never to tighten.")
+    parser.add_argument("--write", action="store_true", help="Write the proposed regions (a backup is kept).")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
+            regions = json.load(f)
+    except FileNotFoundError:
+        print(f"No search regions at {args.config}", file=sys.stderr)
+        return 1
+
+    exclude = ocr_region_keys(args.sequences) | set(args.exclude)
+    proposals = propose_regions(read_match_boxes(args.log), regions, pad=args.pad,
+                                min_samples=args.min_samples, exclude=exclude)
+    print(format_report(proposals))
+    if args.write and proposals:
+        backup_path = write_regions(args.config, regions, proposals)
+        print(f"\nUpdated {len(proposals)} regions in {args.config} (backup: {backup_path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
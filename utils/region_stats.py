@@ -0,0 +1,97 @@
+# region_stats.py
+"""
+Append-only log of where each target was actually found.
+
+Every successful match is written as one JSON line holding the key and the
+window-relative bounding box of the match. utils/region_optimizer.py reads
+the log offline to propose tighter search regions.
+
+Recording only queues the box; a background thread appends whatever has
+queued up in one write, so matching never waits on file I/O.
+"""
+import os
+import json
+import time
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MatchLog:
+    """Background JSON-lines writer for match bounding boxes, rotated at `max_bytes`."""
+
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, queue_size: int = 1024):
+        """
+        Args:
+            path (str): Log file the boxes are appended to.
+            max_bytes (int): Size at which the log is rotated to `path`.1.
+            queue_size (int): Boxes waiting to be written; more are dropped.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, key: str, left: int, top: int, width: int, height: int, confidence: float):
+        """Queues one window-relative match box. Returns immediately."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="match-log", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((key, int(left), int(top), int(width), int(height),
+                                    round(float(confidence), 4), round(time.time(), 3)))
+        except queue.Full:
+            logger.debug(f"Match log queue full; dropped match for '{key}'.")
+
+    def flush(self, timeout: float = 5.0):
+        """Waits (up to `timeout`) for queued boxes to be written."""
+        end_time = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < end_time:
+            time.sleep(0.05)
+
+    def _run(self):
+        while True:
+            entries = [self._queue.get()]
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(entries)
+            except Exception as e:
+                logger.debug(f"Could not write {len(entries)} match log entries: {e}")
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def _write(self, entries: list):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+            # Keep one previous generation; the optimizer reads both.
+            os.replace(self.path, self.path + ".1")
+        lines = [json.dumps({"key": key, "left": left, "top": top, "width": width, "height": height,
+                             "confidence": confidence, "ts": ts})
+                 for key, left, top, width, height, confidence, ts in entries]
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def read_match_boxes(path: str) -> dict:
+    """Returns {key: [(left, top, width, height), ...]} from a match log and its rotated generation."""
+    boxes = {}
+    for log_path in (path + ".1", path):
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    boxes.setdefault(entry["key"], []).append(
+                        (entry["left"], entry["top"], entry["width"], entry["height"]))
+                except (ValueError, KeyError):
+                    continue  # Partially written line
+    return boxes
@@ -0,0 +1,231 @@
+# screen_capture.py
+"""
+Pluggable screen-capture layer.
+
+All vision code grabs pixels through `grab()` / `grab_gray()` instead of
+calling pyautogui.screenshot directly. The default backend uses `mss`,
+which returns raw BGRA buffers that convert straight to numpy without a
+PIL round-trip. `FakeScreen` serves pixels from an image file or array so
+the matching/OCR stack can be exercised headless, e.g.:
+
+    set_backend(FakeScreen.from_file("captures/aden_ready.png"))
+
+Setting REPAIRS_CAPTURE_BACKEND to "mss", "pyautogui" or "fake:<image path>"
+picks the backend at startup without touching code.
+"""
+import os
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+try:
+    import mss
+except ImportError:  # Optional dependency; pyautogui is used as the fallback.
+    mss = None
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureBackend:
+    """
+    Base class for capture backends. `region` is always (left, top, width, height)
+    in screen coordinates; None means the whole (virtual) desktop.
+    """
+    name = "base"
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        """Returns the region as an HxWx3 RGB uint8 array."""
+        raise NotImplementedError
+
+    def grab_gray(self, region: tuple = None) -> np.ndarray:
+        """Returns the region as an HxW grayscale uint8 array."""
+        return cv2.cvtColor(self.grab(region), cv2.COLOR_RGB2GRAY)
+
+    def desktop_bounds(self) -> tuple:
+        """Returns (left, top, width, height) of the whole virtual desktop."""
+        height, width = self.grab().shape[:2]
+        return 0, 0, width, height
+
+    def grab_into(self, region: tuple, rgb_out: np.ndarray, gray_out: np.ndarray):
+        """Captures `region` into preallocated RGB and grayscale buffers of matching size."""
+        np.copyto(rgb_out, self.grab(region))
+        cv2.cvtColor(rgb_out, cv2.COLOR_RGB2GRAY, dst=gray_out)
+
+    def close(self):
+        pass
+
+
+class MssBackend(CaptureBackend):
+    """Native capture via mss. One mss handle per thread, as mss handles are not thread-safe."""
+    name = "mss"
+
+    def __init__(self):
+        if mss is None:
+            raise ImportError("The 'mss' package is not installed.")
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def _raw(self, region):
+        sct = self._sct()
+        if region is None:
+            monitor = sct.monitors[0]  # Union of all monitors
+        else:
+            left, top, width, height = (int(v) for v in region)
+            monitor = {"left": left, "top": top, "width": width, "height": height}
+        return np.asarray(sct.grab(monitor))  # BGRA, no copy
+
+    def desktop_bounds(self) -> tuple:
+        # Monitors left of / above the primary have negative coordinates.
+        monitor = self._sct().monitors[0]
+        return monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        return cv2.cvtColor(self._raw(region), cv2.COLOR_BGRA2RGB)
+
+    def grab_gray(self, region: tuple = None) -> np.ndarray:
+        return cv2.cvtColor(self._raw(region), cv2.COLOR_BGRA2GRAY)
+
+    def grab_into(self, region: tuple, rgb_out: np.ndarray, gray_out: np.ndarray):
+        raw = self._raw(region)
+        cv2.cvtColor(raw, cv2.COLOR_BGRA2RGB, dst=rgb_out)
+        cv2.cvtColor(raw, cv2.COLOR_BGRA2GRAY, dst=gray_out)
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """Fallback backend using pyautogui/PIL. Slower, but available everywhere pyautogui is."""
+    name = "pyautogui"
+
+    def desktop_bounds(self) -> tuple:
+        import pyautogui
+        width, height = pyautogui.size()
+        return 0, 0, width, height
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        import pyautogui
+        if region is None:
+            return np.array(pyautogui.screenshot().convert("RGB"))
+        return np.array(pyautogui.screenshot(region=tuple(int(v) for v in region)).convert("RGB"))
+
+
+class FakeScreen(CaptureBackend):
+    """
+    A synthetic desktop backed by a numpy array. Regions that fall outside
+    the image are padded with black, like an off-screen area would be.
+    Use `paste()` to simulate UI changes between captures.
+    """
+    name = "fake"
+
+    def __init__(self, image):
+        self._lock = threading.Lock()
+        self.set_image(image)
+
+    @classmethod
+    def from_file(cls, path: str) -> "FakeScreen":
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode fake screen image: {path}")
+        return cls(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+    def set_image(self, image):
+        image = np.asarray(image, dtype=np.uint8)
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        with self._lock:
+            self._screen = np.ascontiguousarray(image[:, :, :3])
+
+    def paste(self, image, at: tuple):
+        """Draws `image` (RGB or grayscale) onto the fake desktop with its top-left at `at`."""
+        image = np.asarray(image, dtype=np.uint8)
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        x, y = at
+        with self._lock:
+            h = min(image.shape[0], self._screen.shape[0] - y)
+            w = min(image.shape[1], self._screen.shape[1] - x)
+            self._screen[y:y + h, x:x + w] = image[:h, :w, :3]
+
+    @property
+    def size(self) -> tuple:
+        return self._screen.shape[1], self._screen.shape[0]
+
+    def desktop_bounds(self) -> tuple:
+        return (0, 0) + self.size
+
+    def grab(self, region: tuple = None) -> np.ndarray:
+        with self._lock:
+            if region is None:
+                return self._screen.copy()
+            left, top, width, height = (int(v) for v in region)
+            out = np.zeros((height, width, 3), dtype=np.uint8)
+            src_x0, src_y0 = max(left, 0), max(top, 0)
+            src_x1 = min(left + width, self._screen.shape[1])
+            src_y1 = min(top + height, self._screen.shape[0])
+            if src_x1 > src_x0 and src_y1 > src_y0:
+                out[src_y0 - top:src_y1 - top, src_x0 - left:src_x1 - left] = \
+                    self._screen[src_y0:src_y1, src_x0:src_x1]
+            return out
+
+
+# --- ACTIVE BACKEND ---
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def _default_backend() -> CaptureBackend:
+    choice = os.environ.get("REPAIRS_CAPTURE_BACKEND", "").strip()
+    if choice.startswith("fake:"):
+        return FakeScreen.from_file(choice[len("fake:"):])
+    if choice == "pyautogui":
+        return PyAutoGuiBackend()
+    if mss is not None:
+        return MssBackend()
+    logger.warning("mss is not installed; falling back to the slower pyautogui capture backend.")
+    return PyAutoGuiBackend()
+
+
+def get_backend() -> CaptureBackend:
+    """Returns the active capture backend, creating the default one on first use."""
+    global _BACKEND
+    if _BACKEND is None:
+        with _BACKEND_LOCK:
+            if _BACKEND is None:
+                _BACKEND = _default_backend()
+                logger.info(f"Screen capture backend: {_BACKEND.name}")
+    return _BACKEND
+
+
+def set_backend(backend: CaptureBackend):
+    """Replaces the active capture backend (e.g. with a FakeScreen for tests)."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is not None and _BACKEND is not backend:
+            _BACKEND.close()
+        _BACKEND = backend
+
+
+def grab(region: tuple = None) -> np.ndarray:
+    """Captures `region` as an RGB numpy array using the active backend."""
+    return get_backend().grab(region)
+
+
+def grab_gray(region: tuple = None) -> np.ndarray:
+    """Captures `region` as a grayscale numpy array using the active backend."""
+    return get_backend().grab_gray(region)
+
+
+def desktop_bounds() -> tuple:
+    """Returns (left, top, width, height) of the whole virtual desktop."""
+    return get_backend().desktop_bounds()
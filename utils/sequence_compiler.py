@@ -0,0 +1,247 @@
+# sequence_compiler.py
+"""
+Compiles automation sequences (AutoSequenceRepo/*.json) into validated steps.
+
+Every step is checked once when its sequence is loaded: the action must be
+one the executor knows, its target must name a reference image / search
+region that exists (templates are decoded here, not on the first poll), and
+its parameters are converted to their types. A broken sequence therefore
+fails before a batch starts instead of at step 14 of job 30.
+
+Each step also has a post-condition ("post") saying what to wait for after
+it succeeds:
+    "none"          continue straight away
+    "settle"        until the ADEN window has redrawn and stops changing (see
+                    wait_for_settle: at least SETTLE_FIRST_CHANGE if nothing redraws)
+    "visible:KEY"   until reference image KEY is visible (the step fails otherwise)
+    <seconds>       a fixed delay
+Steps without one get their action's default: UI actions that may redraw the
+window settle, data and typing actions (keystrokes are queued in order) and
+actions that already wait don't wait again.
+
+Compiled sequences are cached per file and recompiled only when the file's
+modification time or size changes.
+"""
+import os
+import re
+import json
+import threading
+import logging
+from collections import namedtuple
+
+from utils.automation_helpers import SEARCH_REGIONS, TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+# index: 1-based position; params: {name: typed value} with defaults filled in; post: a Post.
+Step = namedtuple("Step", "index name action target params on_failure post")
+# kind: "none", "settle", "visible" (value: reference image key) or "delay" (value: seconds).
+Post = namedtuple("Post", "kind value", defaults=(None,))
+Sequence = namedtuple("Sequence", "name description steps")
+# convert: callable turning the raw JSON value into the typed one (raises ValueError if it can't).
+Param = namedtuple("Param", "name convert default required", defaults=(None, False))
+# target: None (no target), "template" (reference image located via its search region),
+# "image" (reference image searched for in the whole window), "region" (search region only),
+# or "optional_region" (a search region if given).
+ActionSpec = namedtuple("ActionSpec", "target params", defaults=((),))
+
+
+class SequenceError(ValueError):
+    """A sequence file that can't be run; the message lists every problem found."""
+
+
+def _key(value) -> str:
+    key = str(value).strip()
+    if not key:
+        raise ValueError("empty")
+    return key
+
+
+def _names(value) -> list[str]:
+    names = [name.strip() for name in str(value).split(",") if name.strip()]
+    if not names:
+        raise ValueError("no names")
+    return names
+
+
+def _keys(value) -> list[str]:
+    keys = [key.strip().lower() for key in re.split(r"[+,]", str(value)) if key.strip()]
+    if not keys:
+        raise ValueError("no keys")
+    return keys
+
+
+def _choice(*options):
+    def convert(value):
+        if value not in options:
+            raise ValueError(f"expected one of {', '.join(options)}")
+        return value
+    return convert
+
+
+_OFFSET = (Param("param1", int, 0), Param("param2", int, 0))
+
+ACTION_SPECS = {
+    # --- Data-driven actions ---
+    "type_from_context": ActionSpec(None, (Param("param1", _key, required=True),)),
+    "count_list_items": ActionSpec(None, (Param("param1", _key, required=True), Param("param2", _key, required=True))),
+    "press_key_context": ActionSpec(None, (Param("param1", _key, required=True), Param("param2", _key, required=True))),
+    # --- OCR and UI interaction actions ---
+    "ocr_capture": ActionSpec("region", (Param("param1", _key, required=True),)),
+    "classify_job_class": ActionSpec("optional_region", (Param("param1", _key, "Job_Class_Cond"),)),
+    "click_center": ActionSpec("template"),
+    "right_click_center": ActionSpec("template"),
+    "double_click_center": ActionSpec("template"),
+    "click_offset": ActionSpec("template", _OFFSET),
+    "double_click_offset": ActionSpec("template", _OFFSET),
+    "move_to_target": ActionSpec("template"),
+    "type_text": ActionSpec(None, (Param("param1", str, ""),)),
+    "type_current_date": ActionSpec(None, (Param("param1", str, "%d/%m/%Y"),)),
+    "press_key": ActionSpec(None, (Param("param1", _key, "enter"),)),
+    "hotkey": ActionSpec(None, (Param("param1", _keys, required=True),)),
+    "paste_from_clipboard": ActionSpec(None),
+    "scroll_mouse": ActionSpec(None, (Param("param1", int, 0),)),
+    "sleep": ActionSpec(None, (Param("param1", float, 1.0),)),
+    "wait_for_target": ActionSpec("template", (Param("param1", float, 10.0),)),
+    "wait_for_state": ActionSpec(None, (Param("param1", _names, required=True), Param("param2", float, 10.0))),
+    "find_image_in_region": ActionSpec("image", (Param("param1", _choice(
+        "click", "click_center", "double_click", "double_click_center", "right_click", "right_click_center",
+        "move_to", "move_to_target", "get_text"), "click"),)),
+}
+
+
+# Actions that may redraw the window; every other action defaults to no post-condition.
+SETTLING_ACTIONS = {"click_center", "right_click_center", "double_click_center", "click_offset", "double_click_offset",
+                    "press_key", "press_key_context", "hotkey", "paste_from_clipboard", "scroll_mouse",
+                    "find_image_in_region"}
+
+
+def default_post(action: str) -> Post:
+    return Post("settle") if action in SETTLING_ACTIONS else Post("none")
+
+
+def parse_post(value) -> Post:
+    """Parses a step's "post" field (see the module docstring). Raises ValueError if invalid."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    else:
+        text = str(value).strip()
+        if text in ("none", "settle"):
+            return Post(text)
+        if text.startswith("visible:"):
+            return Post("visible", _key(text[len("visible:"):]))
+        seconds = float(text)
+    if seconds < 0:
+        raise ValueError("negative delay")
+    return Post("delay", seconds) if seconds else Post("none")
+
+
+def _target_problems(kind: str, target) -> list[str]:
+    if kind is None or (kind == "optional_region" and not target):
+        return []
+    if not target:
+        return ["needs a target"]
+    problems = []
+    if kind in ("template", "image"):
+        try:
+            TEMPLATES.get(target)
+        except (KeyError, FileNotFoundError, ValueError) as e:
+            problems.append(str(e.args[0]) if e.args else repr(e))
+    if kind in ("template", "region", "optional_region") and target not in SEARCH_REGIONS:
+        problems.append(f"no search region named '{target}'")
+    return problems
+
+
+def compile_step(index: int, raw: dict, actions) -> tuple[Step | None, list[str]]:
+    """Validates one raw step. Returns (step, []) or (None, [problem, ...])."""
+    action = raw.get("action", "")
+    label = f"Step {index} ({action or 'no action'})"
+    spec = ACTION_SPECS.get(action)
+    if spec is None or action not in actions:
+        return None, [f"{label}: unknown action"]
+
+    target = raw.get("target_image") or None
+    problems = [f"{label}: {problem}" for problem in _target_problems(spec.target, target)]
+    raw_params = raw.get("parameters") or {}
+    params = {}
+    for param in spec.params:
+        value = raw_params.get(param.name)
+        if value is None or value == "":
+            if param.required:
+                problems.append(f"{label}: {param.name} is required")
+            params[param.name] = param.default
+            continue
+        try:
+            params[param.name] = param.convert(value)
+        except (TypeError, ValueError) as e:
+            problems.append(f"{label}: {param.name} {value!r} is invalid ({e})")
+
+    post = default_post(action)
+    if raw.get("post") not in (None, ""):
+        try:
+            post = parse_post(raw["post"])
+        except ValueError as e:
+            problems.append(f"{label}: post {raw['post']!r} is invalid ({e})")
+        else:
+            if post.kind == "visible":
+                problems.extend(f"{label}: post {problem}" for problem in _target_problems("template", post.value))
+    if problems:
+        return None, problems
+    return Step(index, raw.get("name", ""), action, target, params, raw.get("on_failure", "stop_with_error"), post), []
+
+
+def compile_sequence(data: dict, actions, source: str = "") -> Sequence:
+    """
+    Compiles a parsed sequence file. `actions` is the set of action names the executor
+    dispatches. Raises SequenceError listing every invalid step.
+    """
+    raw_steps = data.get("steps") if isinstance(data, dict) else None
+    if not isinstance(raw_steps, list):
+        raise SequenceError(f"{source or 'Sequence'}: no 'steps' list")
+    steps, problems = [], []
+    for index, raw in enumerate(raw_steps, start=1):
+        if not isinstance(raw, dict):
+            problems.append(f"Step {index}: not an object")
+            continue
+        step, step_problems = compile_step(index, raw, actions)
+        problems.extend(step_problems)
+        if step:
+            steps.append(step)
+    if problems:
+        raise SequenceError(f"{source or 'Sequence'} is invalid:\n" + "\n".join(problems))
+    return Sequence(data.get("task_name", source), data.get("description", ""), tuple(steps))
+
+
+class SequenceCache:
+    """Compiled sequences by file path, recompiled when the file changes on disk."""
+
+    def __init__(self, actions):
+        self.actions = frozenset(actions)
+        self._entries = {}  # path -> ((mtime_ns, size), Sequence)
+        self._lock = threading.Lock()
+
+    def load(self, path: str) -> Sequence:
+        """
+        Returns the compiled sequence at `path`. Raises FileNotFoundError, ValueError for
+        malformed JSON, or SequenceError for an invalid sequence (failures aren't cached).
+        """
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        sequence = compile_sequence(data, self.actions, source=os.path.basename(path))
+        with self._lock:
+            self._entries[path] = (version, sequence)
+        logger.debug(f"Compiled sequence '{sequence.name}' ({len(sequence.steps)} steps) from {path}")
+        return sequence
+
+    def invalidate(self, path: str = None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
@@ -0,0 +1,327 @@
+# sequence_engine.py
+"""
+The automation step engine shared by the app and the debug utility.
+
+Both run compiled sequences (utils/sequence_compiler.py) through the same
+action registry, OCR path and step timing, so whatever is measured in the
+designer is what production does. Hooks called before and after every step
+let a caller instrument a run (the designer colours its step list with them);
+per-action timings are collected for the run summary.
+
+After a step succeeds the engine waits for the step's post-condition (see
+utils/sequence_compiler.py) instead of a fixed pause.
+"""
+import re
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import Future
+
+import numpy as np
+import pyautogui
+
+from utils.automation_helpers import (
+    find_and_click,
+    find_and_right_click,
+    find_label_and_click_offset,
+    find_and_double_click_offset,
+    find_and_move_to,
+    wait_for_image,
+    wait_for_settle,
+    paste_from_clipboard,
+    get_region,
+    find_image_in_region,
+    capture_region,
+)
+from utils.keyword_matcher import get_keyword_matcher
+from utils.ocr_engine import get_ocr_engine
+from utils.ocr_profiles import read_field_confident, is_confident
+from services.aden_state import wait_for_state
+from services.job_class import classify_job_class, JOB_CLASS_ROI_KEY, JOB_CLASS_MAP
+
+logger = logging.getLogger(__name__)
+
+POST_VISIBLE_TIMEOUT = 10  # Seconds a "visible:KEY" post-condition waits for its image
+# Actions that leave the job card as it is: a field captured before them can still be re-captured
+# after them. Any other action may change the screen, so pending OCR stops re-capturing from then on.
+SCREEN_PRESERVING_ACTIONS = {"ocr_capture", "classify_job_class", "count_list_items", "sleep",
+                             "wait_for_target", "wait_for_state"}
+# Context keys holding a list of lines that ocr_capture steps accumulate into (count_list_items reads them).
+LIST_FIELDS = {"descriptions"}
+
+
+class SequenceEngine:
+    """Executes compiled steps against a data context."""
+
+    def __init__(self, ocr_cache=None, debug_captures=None):
+        self.ocr_cache = ocr_cache
+        self.debug_captures = debug_captures
+        # hook(step) before, hook(step, success, seconds) after every step
+        self.before_step_hooks = []
+        self.after_step_hooks = []
+        self._timings = {}  # action -> [count, total seconds, max seconds]
+        # Bumped before every step that may change the screen (see SCREEN_PRESERVING_ACTIONS)
+        self._screen_epoch = 0
+        self._job_ref = "UNKNOWN"  # Job the current run's debug captures are filed under
+        self.actions = {
+            # --- Data-Driven Actions ---
+            "type_from_context": self._type_from_context,
+            "count_list_items": self._count_list_items,
+            "press_key_context": self._press_key_context,
+            # --- OCR and UI Interaction Actions ---
+            "ocr_capture": self._ocr_capture,
+            "classify_job_class": self._classify_job_class,
+            "click_center": lambda step, _: find_and_click(step.target),
+            "right_click_center": lambda step, _: find_and_right_click(step.target),
+            "double_click_center": lambda step, _: find_and_click(step.target, clicks=2),
+            "click_offset": lambda step, _: find_label_and_click_offset(
+                step.target, x_offset=step.params["param1"], y_offset=step.params["param2"]),
+            "double_click_offset": lambda step, _: find_and_double_click_offset(
+                step.target, x_offset=step.params["param1"], y_offset=step.params["param2"]),
+            "move_to_target": lambda step, _: find_and_move_to(step.target),
+            "type_text": self._type_text,
+            "type_current_date": self._type_current_date,
+            "press_key": self._press_key,
+            "hotkey": self._hotkey,
+            "paste_from_clipboard": lambda step, _: paste_from_clipboard(),
+            "scroll_mouse": self._scroll_mouse,
+            "sleep": self._sleep,
+            "wait_for_target": lambda step, _: wait_for_image(step.target, step.params["param1"]),
+            "wait_for_state": self._wait_for_state,
+            "find_image_in_region": self._find_image_in_region,
+        }
+
+    # --- Running ---
+
+    def run(self, steps, data_context: dict, stop_event=None, label: str = "sequence", job_ref: str = None) -> bool:
+        """
+        Runs steps in order until one fails or `stop_event` is set, then waits for any OCR
+        still in flight. Returns True if every step succeeded. Debug captures are filed under
+        `job_ref` (default: the context's job_ref when the run starts; an ocr_capture step may
+        replace the context's value with a pending read).
+        """
+        if job_ref is None:
+            job_ref = data_context.get("job_ref")
+        self._job_ref = job_ref if isinstance(job_ref, str) and job_ref else "UNKNOWN"
+        success = True
+        for step in steps:
+            if stop_event is not None and stop_event.is_set():
+                logger.warning(f"Stop signal received. Halting {label}.")
+                success = False
+                break
+
+            logger.info(f"Executing step {step.index}: {step.action} on target {step.target}")
+            # Steps name the context keys they read in their parameters; make sure those are recognised
+            self.resolve_pending_ocr(data_context, keys=set(str(v) for v in step.params.values()))
+            if not self.execute_step(step, data_context):
+                logger.error(f"Stopping {label} due to failure at step {step.index} ({step.action}).")
+                success = False
+                break
+
+        self.resolve_pending_ocr(data_context)
+        return success
+
+    def execute_step(self, step, data_context: dict) -> bool:
+        """
+        Executes a single compiled step through the action registry, then waits for its
+        post-condition. Returns True on success.
+        """
+        for hook in self.before_step_hooks:
+            hook(step)
+        if step.action not in SCREEN_PRESERVING_ACTIONS:
+            self._screen_epoch += 1
+        started = time.perf_counter()
+        try:
+            success = bool(self.actions[step.action](step, data_context)) and self._wait_after(step)
+        except Exception as e:
+            logger.error(f"Error during step '{step.action}': {e}", exc_info=True)
+            success = False
+        elapsed = time.perf_counter() - started
+
+        timing = self._timings.setdefault(step.action, [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+        timing[2] = max(timing[2], elapsed)
+        for hook in self.after_step_hooks:
+            hook(step, success, elapsed)
+        return success
+
+    def _wait_after(self, step) -> bool:
+        kind, value = step.post
+        if kind == "settle":
+            wait_for_settle()  # Best effort; a window that keeps changing isn't a failure
+        elif kind == "delay":
+            time.sleep(value)
+        elif kind == "visible":
+            return wait_for_image(value, POST_VISIBLE_TIMEOUT)
+        return True
+
+    def stats(self) -> dict:
+        """Per action: {"calls", "avg_ms", "max_ms"} over every step executed so far."""
+        return {action: {"calls": count, "avg_ms": total / count * 1000, "max_ms": worst * 1000}
+                for action, (count, total, worst) in self._timings.items()}
+
+    # --- Overlapped OCR ---
+
+    def resolve_pending_ocr(self, data_context: dict, keys=None):
+        """Waits for queued OCR results (all, or only those stored under `keys`) and applies them."""
+        for key, value in list(data_context.items()):
+            if isinstance(value, Future) and (keys is None or key in keys):
+                try:
+                    data_context.update(value.result())
+                    logger.info(f"Assigned captured text to data context key: '{key}'")
+                except Exception as e:
+                    logger.error(f"OCR for '{key}' failed: {e}", exc_info=True)
+                    data_context[key] = [] if key in LIST_FIELDS else ""
+
+    def _recognize_capture(self, img, data_key, job_ref, previous=None, region=None, epoch=None) -> dict:
+        """
+        OCR worker task for an ocr_capture step. Returns the data context updates for the field;
+        `previous` is the key's earlier value (possibly still a Future) for fields that accumulate.
+        A field read with low confidence is re-read, and re-captured from `region` as long as the
+        screen hasn't changed since the capture (`epoch`).
+        """
+        def recapture():
+            if region is None or self._screen_epoch != epoch:
+                return None
+            fresh = np.array(capture_region(region, newer_than=time.time()), copy=True)
+            return fresh if self._screen_epoch == epoch else None
+
+        # Cropping, scaling, thresholding and the Tesseract config come from the field's OCR profile
+        result, retries = read_field_confident(img, data_key, recapture=recapture, cache=self.ocr_cache)
+        text = result.text
+        confident = is_confident(result, data_key)
+        if retries:
+            logger.info(f"Re-read '{data_key}' {retries} time(s); best confidence {result.confidence:.0f}"
+                        f"{'' if confident else ' (still low)'}.")
+        if self.debug_captures is not None:
+            status = "empty" if not text.strip() else "ok" if confident else "low_confidence"
+            self.debug_captures.submit(job_ref, data_key, img, status=status)
+
+        if data_key == 'job_ref':
+            return {data_key: re.sub(r'[^A-Za-z0-9]', '', text).strip()}
+        if data_key == 'descriptions':
+            try:
+                updates = previous.result() if isinstance(previous, Future) else {'descriptions': previous or []}
+            except Exception as e:
+                # The earlier chunk's read is lost, but this chunk's lines are still kept
+                logger.error(f"OCR of an earlier '{data_key}' chunk failed: {e}")
+                updates = {'descriptions': []}
+            updates = {**updates, 'descriptions': list(updates['descriptions']) + text.splitlines()}
+            keyword = get_keyword_matcher().find(text)
+            if keyword:
+                updates['tool_subject'] = keyword
+                logger.info(f"Found Tool Subject keyword: '{keyword}'")
+            return updates
+        if data_key == 'Job_Class_Cond':
+            return {data_key: JOB_CLASS_MAP.get(text.strip().upper(), text.strip())}
+        return {data_key: text.strip()}
+
+    # --- Actions ---
+
+    def _type_from_context(self, step, data_context):
+        key = step.params["param1"]
+        if key in data_context:
+            pyautogui.write(str(data_context[key]), interval=0.05)
+            return True
+        logger.error(f"Key '{key}' not found in data context.")
+        return False
+
+    def _count_list_items(self, step, data_context):
+        input_key, output_key = step.params["param1"], step.params["param2"]
+        input_list = data_context.get(input_key, [])
+        if isinstance(input_list, list):
+            data_context[output_key] = len(input_list)
+            logger.info(f"Counted {len(input_list)} items in '{input_key}', stored in '{output_key}'.")
+            return True
+        logger.error(f"Key '{input_key}' in context is not a list.")
+        return False
+
+    def _press_key_context(self, step, data_context):
+        key, count_key = step.params["param1"], step.params["param2"]
+        count = data_context.get(count_key, 0)
+        if isinstance(count, int):
+            pyautogui.press(key, presses=count)
+            return True
+        logger.error(f"Count variable '{count_key}' is not an integer.")
+        return False
+
+    def _ocr_capture(self, step, data_context):
+        absolute_region = get_region(step.target)
+        logger.info(f"Performing OCR capture on region '{step.target}' at {absolute_region}")
+        img = capture_region(absolute_region, newer_than=time.time())
+
+        data_key = step.params["param1"]
+        # Recognition runs on the OCR pool; the step only waits for the capture. The future is
+        # resolved when a later step reads the key, or at the end of the run at the latest.
+        data_context[data_key] = get_ocr_engine().submit(
+            self._recognize_capture, np.array(img, copy=True), data_key, self._job_ref, data_context.get(data_key),
+            absolute_region, self._screen_epoch)
+        logger.info(f"Queued OCR of '{step.target}' for data context key: '{data_key}'")
+        return True
+
+    def _classify_job_class(self, step, data_context):
+        # Target: the job class field (defaults to JOB_CLASS_COND), Parameter 1: data context key
+        roi_key = step.target or JOB_CLASS_ROI_KEY
+        letter, confidence, scores = classify_job_class(roi_key)
+        score_report = ", ".join(f"{name}: {score:.2f}" for name, score in sorted(scores.items()))
+        if letter is None:
+            # No class template is confident (e.g. a class without a reference image): read it instead
+            region = get_region(roi_key)
+            img = capture_region(region, newer_than=time.time())
+            result, _ = read_field_confident(
+                img, "Job_Class_Cond", cache=self.ocr_cache,
+                recapture=lambda: capture_region(region, newer_than=time.time()))
+            letter = result.text.strip().upper()
+            logger.info(f"Job class not matched by template [{score_report}]; OCR read '{letter}'.")
+        else:
+            logger.info(f"Job class '{letter}' matched with confidence {confidence:.2f} [{score_report}].")
+        data_context[step.params["param1"]] = JOB_CLASS_MAP.get(letter, letter)
+        return True
+
+    def _type_text(self, step, data_context):
+        pyautogui.write(step.params["param1"], interval=0.05)
+        return True
+
+    def _type_current_date(self, step, data_context):
+        # Parameter 1 can optionally specify a format (e.g., %d-%m-%Y)
+        date_string = datetime.now().strftime(step.params["param1"])
+        logger.info(f"Typing current date: {date_string}")
+        pyautogui.write(date_string, interval=0.05)
+        return True
+
+    def _press_key(self, step, data_context):
+        pyautogui.press(step.params["param1"])
+        return True
+
+    def _hotkey(self, step, data_context):
+        # Parameter 1: key combination, e.g. "ctrl+s"
+        pyautogui.hotkey(*step.params["param1"])
+        return True
+
+    def _scroll_mouse(self, step, data_context):
+        pyautogui.scroll(step.params["param1"])
+        return True
+
+    def _sleep(self, step, data_context):
+        time.sleep(step.params["param1"])
+        return True
+
+    def _wait_for_state(self, step, data_context):
+        # Parameter 1: comma-separated ADEN state(s) to wait for, Parameter 2: timeout in seconds
+        expected = step.params["param1"]
+        state = wait_for_state(expected, timeout=step.params["param2"])
+        data_context["aden_state"] = state
+        return state in expected
+
+    def _find_image_in_region(self, step, data_context):
+        secondary_action = step.params["param1"]
+        logger.info(f"Finding image '{step.target}' in ADEN window region and performing '{secondary_action}'")
+        result = find_image_in_region(step.target, step.target, secondary_action)
+
+        # If the secondary action is "get_text" and text was found, store it in the context
+        if secondary_action == "get_text" and result and isinstance(result, str):
+            output_key = f"{step.target}_text"
+            data_context[output_key] = result
+            logger.info(f"Stored extracted text in context variable '{output_key}'")
+        return result if isinstance(result, bool) else bool(result)
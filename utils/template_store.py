@@ -0,0 +1,78 @@
+# template_store.py
+"""
+In-memory store of decoded reference images.
+
+The automation helpers poll the screen every few hundred milliseconds and
+used to hand a PNG path to pyautogui on every attempt, which decoded the
+file again each time. The store decodes each asset to grayscale once and
+only re-reads it when the file on disk changes (e.g. after the debug
+utility recaptures a reference image).
+"""
+import os
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateStore:
+    """Serves grayscale numpy templates for the keys of an asset dictionary."""
+
+    def __init__(self, assets: dict):
+        # Keep a reference (not a copy) so assets added at runtime are visible.
+        self._assets = assets
+        self._cache = {}  # key -> (path, mtime, ndarray)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> np.ndarray:
+        """
+        Returns the grayscale template for `key`, decoding it on first use or
+        whenever the file's modification time has changed.
+        """
+        path = self._assets.get(key)
+        if not path:
+            raise KeyError(f"No image asset for key '{key}'")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            raise FileNotFoundError(f"Reference image for '{key}' not found at: {path}")
+
+        cached = self._cache.get(key)
+        if cached and cached[0] == path and cached[1] == mtime:
+            return cached[2]
+
+        with self._lock:
+            # np.fromfile + imdecode copes with non-ASCII paths on Windows, unlike cv2.imread.
+            template = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                raise ValueError(f"Could not decode reference image for '{key}' at: {path}")
+            self._cache[key] = (path, mtime, template)
+            logger.debug(f"Loaded template '{key}' {template.shape[::-1]} from {path}")
+            return template
+
+    def version(self, key: str):
+        """Modification time of the currently cached template, or None if not loaded yet."""
+        cached = self._cache.get(key)
+        return cached[1] if cached else None
+
+    def preload(self) -> int:
+        """Decodes every known asset up front. Returns the number loaded."""
+        loaded = 0
+        for key in list(self._assets):
+            try:
+                self.get(key)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Could not preload template '{key}': {e}")
+        return loaded
+
+    def invalidate(self, key: str = None):
+        """Drops one cached template (or all of them) so it is re-read on next use."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
@@ -0,0 +1,104 @@
+# vision.py
+"""
+Low-level image matching primitives shared by the automation helpers.
+Everything here works on numpy arrays so callers can decide where the
+pixels come from (live screen, cached frame, or a file on disk).
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+def to_gray(image) -> np.ndarray:
+    """Converts an RGB/RGBA/PIL image to a single-channel uint8 array."""
+    array = np.asarray(image)
+    if array.ndim == 2:
+        return array
+    if array.shape[2] == 4:
+        return cv2.cvtColor(array, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+
+
+def match_template(haystack: np.ndarray, template: np.ndarray) -> tuple[float, tuple[int, int]]:
+    """
+    Runs a normalised cross-correlation match of `template` over `haystack`.
+
+    Returns:
+        tuple: (best confidence, (x, y) of the best match's top-left corner).
+        Confidence is 0.0 when the haystack is smaller than the template.
+    """
+    if haystack.shape[0] < template.shape[0] or haystack.shape[1] < template.shape[1]:
+        return 0.0, (0, 0)
+    result = cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return float(max_val), max_loc
+
+
+def _top_candidates(result: np.ndarray, count: int, threshold: float, suppress: tuple) -> list:
+    """Picks up to `count` peaks from a match result, blanking a `suppress` (w, h) box around each."""
+    result = result.copy()
+    peaks = []
+    sw, sh = suppress
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if max_val < threshold:
+            break
+        peaks.append((float(max_val), (x, y)))
+        result[max(0, y - sh):y + sh + 1, max(0, x - sw):x + sw + 1] = -1.0
+    return peaks
+
+
+def pyramid_match(haystack: np.ndarray, template: np.ndarray, levels: int = 2, candidates: int = 5,
+                  coarse_threshold: float = 0.5, min_template_side: int = 8, margin: int = 4):
+    """
+    Coarse-to-fine template search. The haystack and template are halved `levels`
+    times; the coarsest level is searched exhaustively for the best `candidates`
+    peaks, and each finer level only re-matches a small window around the
+    surviving candidates. The level count is reduced automatically so the
+    downsampled template never gets smaller than `min_template_side` pixels.
+
+    Returns:
+        tuple: (confidence, (x, y), timings) where (x, y) is the best full-resolution
+        top-left position and `timings` is a list of (level, seconds, candidates searched),
+        coarsest level first.
+    """
+    while levels > 0 and min(template.shape[:2]) >> levels < min_template_side:
+        levels -= 1
+
+    hay_pyr, tpl_pyr = [haystack], [template]
+    for _ in range(levels):
+        hay_pyr.append(cv2.pyrDown(hay_pyr[-1]))
+        tpl_pyr.append(cv2.pyrDown(tpl_pyr[-1]))
+
+    timings = []
+    started = time.perf_counter()
+    hay, tpl = hay_pyr[levels], tpl_pyr[levels]
+    if hay.shape[0] < tpl.shape[0] or hay.shape[1] < tpl.shape[1]:
+        return 0.0, (0, 0), timings
+    result = cv2.matchTemplate(hay, tpl, cv2.TM_CCOEFF_NORMED)
+    threshold = coarse_threshold if levels else -1.0
+    peaks = _top_candidates(result, candidates if levels else 1, threshold,
+                            (tpl.shape[1] // 2, tpl.shape[0] // 2))
+    timings.append((levels, time.perf_counter() - started, 1))
+
+    for level in range(levels - 1, -1, -1):
+        started = time.perf_counter()
+        hay, tpl = hay_pyr[level], tpl_pyr[level]
+        th, tw = tpl.shape[:2]
+        refined = []
+        for _, (cx, cy) in peaks:
+            # Scale the coarse position up and search a small window around it
+            x0 = max(0, cx * 2 - margin)
+            y0 = max(0, cy * 2 - margin)
+            x1 = min(hay.shape[1], cx * 2 + margin + tw)
+            y1 = min(hay.shape[0], cy * 2 + margin + th)
+            score, (x, y) = match_template(hay[y0:y1, x0:x1], tpl)
+            refined.append((score, (x0 + x, y0 + y)))
+        timings.append((level, time.perf_counter() - started, len(peaks)))
+        peaks = sorted(refined, reverse=True)
+
+    if not peaks:
+        return 0.0, (0, 0), timings
+    score, loc = peaks[0]
+    return score, loc, timings
@@ -0,0 +1,71 @@
+# waiting.py
+"""
+Building blocks for change-driven waits.
+
+Re-running a template match on pixels that haven't changed can never give a
+different answer, so waiters capture the (cheap) region, ask a
+ChangeDetector whether anything moved, and only match when it did. Between
+attempts they sleep for a Backoff delay that starts short (so a target that
+appears is seen quickly) and grows while the screen stays still.
+"""
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """Remembers the last frame of a region and reports whether new pixels differ from it."""
+
+    def __init__(self, threshold: int = 12, min_pixels: int = 1):
+        """
+        Args:
+            threshold (int): Minimum per-pixel grayscale difference that counts as a change.
+                Small values filter out anti-aliasing/cursor-blink noise.
+            min_pixels (int): Number of pixels that must change. Raise it to ignore small
+                local changes such as a blinking text caret when watching a whole window.
+        """
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+        self._previous = None
+        self._key = None
+
+    def reset(self):
+        self._previous = None
+        self._key = None
+
+    def changed(self, gray: np.ndarray, key=None) -> bool:
+        """
+        Returns True if `gray` differs from the previously seen frame (or if `key`, e.g.
+        the capture region, changed). The first call always returns True.
+        """
+        if self._previous is None or key != self._key or gray.shape != self._previous.shape:
+            is_changed = True
+        else:
+            difference = cv2.absdiff(gray, self._previous)
+            if self.min_pixels <= 1:
+                is_changed = bool(difference.max() > self.threshold)
+            else:
+                is_changed = cv2.countNonZero(cv2.threshold(difference, self.threshold, 255, cv2.THRESH_BINARY)[1]) >= self.min_pixels
+        if is_changed:
+            # Copy: `gray` may be a view into a shared frame buffer that will be reused.
+            self._previous = np.array(gray, copy=True)
+            self._key = key
+        return is_changed
+
+
+class Backoff:
+    """Geometric sleep schedule between poll attempts, reset whenever the screen changes."""
+
+    def __init__(self, min_delay: float = 0.05, max_delay: float = 0.5, factor: float = 1.6):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self._delay = min_delay
+
+    def reset(self):
+        self._delay = self.min_delay
+
+    def next(self) -> float:
+        """Returns the delay to sleep now and grows the next one."""
+        delay = self._delay
+        self._delay = min(self._delay * self.factor, self.max_delay)
+        return delay
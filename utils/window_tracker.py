@@ -0,0 +1,130 @@
+# window_tracker.py
+"""
+Keeps track of where the ADEN window is.
+
+Finding the window means searching the whole desktop, so the position is
+cached. Before the cache is trusted it is re-checked by matching the anchor
+image in a tiny padded ROI at the cached position (a millisecond-scale
+check, throttled to `verify_interval`). If the anchor moved a few pixels the
+cache is nudged; if it is gone a full search runs. The last known position
+is saved to disk so the next app start can skip the desktop search.
+"""
+import os
+import json
+import time
+import threading
+import logging
+
+from utils.vision import match_template
+
+logger = logging.getLogger(__name__)
+
+
+class WindowTracker:
+    """Self-healing cache of the ADEN window region."""
+
+    def __init__(self, anchor_provider, capture_gray, finder, state_path: str,
+                 window_size: tuple = (945, 600), confidence: float = 0.85,
+                 verify_interval: float = 0.25, pad: int = 8):
+        """
+        Args:
+            anchor_provider (callable): Returns the anchor template as a grayscale array.
+            capture_gray (callable): capture_gray(region) -> grayscale array of that screen region.
+            finder (callable): Full search; returns the anchor's (left, top) or None.
+            state_path (str): JSON file the last known position is persisted to.
+        """
+        self._anchor_provider = anchor_provider
+        self._capture_gray = capture_gray
+        self._finder = finder
+        self.state_path = state_path
+        self.window_size = window_size
+        self.confidence = confidence
+        self.verify_interval = verify_interval
+        self.pad = pad
+        self._region = None
+        self._verified_at = 0.0
+        self._loaded_state = False
+        self._lock = threading.RLock()
+
+    @property
+    def cached_region(self) -> tuple | None:
+        """The current cached region, without any verification."""
+        return self._region
+
+    def get(self, force_refind: bool = False) -> tuple | None:
+        """Returns the window region, verifying or re-finding it as needed."""
+        with self._lock:
+            if force_refind:
+                return self._refind()
+            if self._region is None and not self._loaded_state:
+                self._loaded_state = True
+                saved = self._load_state()
+                if saved and self._verify(saved):
+                    logger.info(f"ADEN window restored from saved position: {self._region}")
+                    return self._region
+            if self._region is None:
+                return self._refind()
+            if time.time() - self._verified_at < self.verify_interval:
+                return self._region
+            if self._verify(self._region[:2]):
+                return self._region
+            logger.warning(f"ADEN window anchor no longer at {self._region[:2]}; searching again.")
+            return self._refind()
+
+    def invalidate(self):
+        with self._lock:
+            self._region = None
+
+    def _verify(self, position: tuple) -> bool:
+        """Looks for the anchor in a small padded ROI around `position`; updates the cache on a hit."""
+        try:
+            anchor = self._anchor_provider()
+            h, w = anchor.shape
+            left, top = position[0] - self.pad, position[1] - self.pad
+            roi = self._capture_gray((left, top, w + 2 * self.pad, h + 2 * self.pad))
+            score, (x, y) = match_template(roi, anchor)
+        except Exception as e:
+            logger.debug(f"ADEN anchor verification failed: {e}")
+            return False
+        if score < self.confidence:
+            return False
+        found = (left + x, top + y)
+        if self._region is None or found != tuple(self._region[:2]):
+            self._set(found)
+        self._verified_at = time.time()
+        return True
+
+    def _refind(self) -> tuple | None:
+        position = self._finder()
+        if position is None:
+            self._region = None
+            return None
+        self._set(position)
+        self._verified_at = time.time()
+        logger.info(f"ADEN window found at: {self._region}")
+        return self._region
+
+    def _set(self, position: tuple):
+        self._region = (int(position[0]), int(position[1])) + tuple(self.window_size)
+        self._save_state()
+
+    def _load_state(self) -> tuple | None:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["left"]), int(data["top"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable window state file {self.state_path}: {e}")
+            return None
+
+    def _save_state(self):
+        try:
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"left": self._region[0], "top": self._region[1],
+                           "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Could not persist ADEN window position: {e}")